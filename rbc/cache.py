@@ -0,0 +1,392 @@
+"""Caches of compilation results.
+
+The persistent cache is a directory of pickled entries that are
+addressed by hexdigest keys. The in-memory cache holds the entries
+of the current process and may be backed by the persistent cache. The
+total size of the entries is bounded: when the bound is exceeded, the
+least recently used entries are evicted.
+
+"""
+import os
+import dis
+import types
+import pickle
+import hashlib
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+
+
+def hashkey(*items):
+    """Return hexdigest of the string representation of items.
+    """
+    h = hashlib.sha256()
+    for item in items:
+        h.update(repr(item).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _object_key(obj, memo):
+    """Return hashable representation of an object that a compiled
+    function may depend on.
+
+    Used internally.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        return obj
+    if isinstance(obj, (tuple, list)):
+        return type(obj).__name__, tuple(_object_key(o, memo) for o in obj)
+    if isinstance(obj, types.ModuleType):
+        return 'module', obj.__name__
+    if isinstance(obj, types.CodeType):
+        return _code_key(obj, memo)
+    if isinstance(obj, np.ndarray):
+        return 'ndarray', obj.dtype.str, obj.shape, hashlib.sha256(obj.tobytes()).hexdigest()
+    py_func = getattr(obj, 'py_func', None)  # numba Dispatcher
+    if isinstance(py_func, types.FunctionType):
+        obj = py_func
+    if isinstance(obj, types.FunctionType):
+        return _function_key(obj, memo)
+    if isinstance(obj, type):
+        return 'type', obj.__module__, obj.__qualname__
+    # Fallback to repr. When repr contains object address, the key
+    # will be different in different processes that leads to cache
+    # misses but never to wrong cache hits.
+    return type(obj).__module__, type(obj).__qualname__, repr(obj)
+
+
+def _code_key(code, memo):
+    consts = tuple(_code_key(c, memo) if isinstance(c, types.CodeType) else repr(c)
+                   for c in code.co_consts)
+    return ('code', code.co_name, code.co_code, consts, code.co_names,
+            code.co_varnames, code.co_freevars, code.co_cellvars)
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for c in code.co_consts:
+        if isinstance(c, types.CodeType):
+            names.update(_code_names(c))
+    return names
+
+
+def _code_attributes(code):
+    """Return attribute chains ``(name, attr, ...)`` of the global and
+    closure variables that are accessed in code.
+    """
+    chains = set()
+    chain = None
+    for instr in dis.get_instructions(code):
+        if chain is not None and instr.opname in ('LOAD_ATTR', 'LOAD_METHOD'):
+            chain += (instr.argval,)
+            continue
+        if chain is not None and len(chain) > 1:
+            chains.add(chain)
+        if instr.opname in ('LOAD_GLOBAL', 'LOAD_NAME', 'LOAD_DEREF'):
+            chain = (instr.argval,)
+        else:
+            chain = None
+    if chain is not None and len(chain) > 1:
+        chains.add(chain)
+    for c in code.co_consts:
+        if isinstance(c, types.CodeType):
+            chains.update(_code_attributes(c))
+    return chains
+
+
+def _variable_key(name, obj, attributes, memo):
+    """Return hashable representation of a global or closure variable.
+    The objects that are accessed as attributes of a module are
+    included because modules are represented by names only.
+    """
+    key = _object_key(obj, memo)
+    if not isinstance(obj, types.ModuleType):
+        return key
+    items = []
+    for chain in sorted(attributes):
+        if chain[0] != name:
+            continue
+        value = obj
+        for i, attr in enumerate(chain[1:]):
+            if not isinstance(value, types.ModuleType):
+                break
+            value = getattr(value, attr, None)
+        else:
+            i = len(chain) - 1
+        items.append((chain[:i + 1], _object_key(value, memo)))
+    return key + tuple(items)
+
+
+def _function_key(func, memo):
+    name = f'{func.__module__}.{func.__qualname__}'
+    if id(func) in memo:
+        # recursive reference
+        return 'function', name
+    memo.add(id(func))
+    code = func.__code__
+    attributes = _code_attributes(code)
+    closure = []
+    for n, cell in zip(code.co_freevars, func.__closure__ or ()):
+        try:
+            closure.append(_variable_key(n, cell.cell_contents, attributes, memo))
+        except ValueError:  # empty cell
+            closure.append(None)
+    closure = tuple(closure)
+    defaults = _object_key(func.__defaults__, memo)
+    global_names = []
+    for n in sorted(_code_names(code)):
+        if n in func.__globals__:
+            global_names.append((n, _variable_key(n, func.__globals__[n], attributes, memo)))
+    return 'function', name, _code_key(code, memo), closure, defaults, tuple(global_names)
+
+
+def function_key(func):
+    """Return a hexdigest that identifies a Python function.
+
+    The key is computed from the function bytecode, constants,
+    closure variables, default values of arguments, and the global
+    objects that the function refers to, including the attributes of
+    referenced modules. The referenced Python functions are processed
+    recursively.
+    """
+    return hashkey(_function_key(func, set()))
+
+
+class DiskCache:
+    """A size-bounded LRU cache of picklable objects stored in a directory.
+
+    Usage:
+
+    .. code-block:: python
+
+        cache = DiskCache('/path/to/cache', max_size=2**28)
+        value = cache.get(key)
+        if value is None:
+            value = <compute value>
+            cache.set(key, value)
+
+    The directory can be shared between processes. The access time of
+    an entry is recorded in the file modification time that is used
+    for evicting the least recently used entries when the total size
+    of entries exceeds `max_size` bytes.
+    """
+
+    suffix = '.pkl'
+
+    def __init__(self, path, max_size=2**28):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = int(max_size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.path!r}, max_size={self.max_size})'
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def __contains__(self, key):
+        return os.path.isfile(self._filename(key))
+
+    def get(self, key, default=None):
+        """Return cached object or default when key is not in cache.
+        """
+        fn = self._filename(key)
+        try:
+            with open(fn, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            value = default
+            hit = False
+        except Exception as msg:
+            # corrupted or incompatible entry
+            warnings.warn(f'rbc.{type(self).__name__}: failed to load {fn}: {msg}')
+            self.remove(key)
+            value = default
+            hit = False
+        else:
+            hit = True
+            try:
+                os.utime(fn)
+            except OSError:
+                pass
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def set(self, key, value):
+        """Store object in cache.
+        """
+        i, tmpfn = tempfile.mkstemp(suffix='.tmp', prefix='rbc-cache-', dir=self.path)
+        try:
+            with os.fdopen(i, mode='wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpfn, self._filename(key))
+        except Exception:
+            if os.path.exists(tmpfn):
+                os.remove(tmpfn)
+            raise
+        self._evict()
+
+    def remove(self, key):
+        """Remove cache entry.
+        """
+        try:
+            os.remove(self._filename(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        size = sum(e[1] for e in entries)
+        if size <= self.max_size:
+            return
+        for _, sz, fn in sorted(entries):
+            try:
+                os.remove(fn)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self.evictions += 1
+            size -= sz
+            if size <= self.max_size:
+                break
+
+    @property
+    def size(self):
+        """Return the total size of cache entries in bytes.
+        """
+        return sum(e[1] for e in self._entries())
+
+    def clear(self):
+        """Remove all cache entries.
+        """
+        for _, _, fn in self._entries():
+            try:
+                os.remove(fn)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Return cache statistics as a dictionary.
+        """
+        entries = self._entries()
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    entries=len(entries), size=sum(e[1] for e in entries),
+                    max_size=self.max_size)
+
+
+class MemoryCache:
+    """A size-bounded LRU cache of bytes-like entries held in memory.
+
+    The entries are tuples whose first item is bytes, as stored by
+    `irtools.compile_instance`, and the size of an entry is the length
+    of its first item. When `backend` cache is specified, the cache
+    misses are looked up from the backend and new entries are stored
+    also in the backend.
+    """
+
+    def __init__(self, max_size=2**28, backend=None):
+        self.max_size = int(max_size)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(max_size={self.max_size}, backend={self.backend!r})'
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def _sizeof(value):
+        return len(value[0])
+
+    def get(self, key, default=None):
+        """Return cached object or default when key is not in cache.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        """Store object in cache.
+        """
+        self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def _store(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._sizeof(old)
+            self._entries[key] = value
+            self._size += self._sizeof(value)
+            while self._size > self.max_size and self._entries:
+                _, old = self._entries.popitem(last=False)
+                self._size -= self._sizeof(old)
+                self.evictions += 1
+
+    def remove(self, key):
+        """Remove cache entry.
+        """
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._size -= self._sizeof(value)
+
+    @property
+    def size(self):
+        """Return the total size of cache entries in bytes.
+        """
+        return self._size
+
+    def clear(self):
+        """Remove all cache entries. The backend cache is not cleared.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return cache statistics as a dictionary.
+        """
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    entries=len(self._entries), size=self._size,
+                    max_size=self.max_size)
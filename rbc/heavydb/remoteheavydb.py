@@ -19,7 +19,8 @@ from . import (
     HeavyDBCompilerPipeline, HeavyDBCursorType,
     BufferMeta, HeavyDBColumnListType, HeavyDBTableFunctionManagerType)
 from rbc.targetinfo import TargetInfo
-from rbc.irtools import compile_to_LLVM
+from rbc.irtools import compile_to_LLVM, get_compile_cache
+from rbc.cache import MemoryCache
 from rbc.errors import ForbiddenNameError, HeavyDBServerError
 from rbc.utils import parse_version, version_date
 from rbc import ctools, typesystem
@@ -453,6 +454,11 @@ class RemoteHeavyDB(RemoteJIT):
         # An user-defined device-LLVM IR mapping.
         self.user_defined_llvm_ir = {}
 
+        # Compiled function instances of callers. When a caller is
+        # added, register recompiles only the instances that are not
+        # in this cache.
+        self.instance_cache = MemoryCache(backend=get_compile_cache())
+
     def __repr__(self):
         return (f'{type(self).__name__}(user={self.user!r}, password="{"*"*len(self.password)}",'
                 f' host={self.host!r}, port={self.port}, dbname={self.dbname!r})')
@@ -1166,7 +1172,7 @@ class RemoteHeavyDB(RemoteJIT):
                 functions_and_signatures = []
                 function_signatures = defaultdict(list)
                 for caller in reversed(self.get_callers()):
-                    signatures = {}
+                    signatures, options = {}, {}
                     name = caller.func.__name__
                     if name in self.forbidden_names:
                         raise ForbiddenNameError(
@@ -1177,7 +1183,8 @@ class RemoteHeavyDB(RemoteJIT):
                             f'       return np.trunc(x)\n\n'
                             f'For more information, see: '
                             f'https://github.com/xnd-project/rbc/issues/32')
-                    for sig in caller.get_signatures():
+                    signature = caller.signature.normalized(caller.func)
+                    for sig in signature.signatures:
                         i = len(function_signatures[name])
                         if sig in function_signatures[name]:
                             if self.debug:
@@ -1208,21 +1215,25 @@ class RemoteHeavyDB(RemoteJIT):
                         else:
                             udfs_map[fid] = self._make_udf(caller, orig_sig, sig)
                         signatures[fid] = sig
-                    functions_and_signatures.append((caller.func, signatures))
+                        options[fid] = signature.signature_options.get(orig_sig)
+                    functions_and_signatures.append((caller.func, signatures, options))
 
                 llvm_module, succesful_fids = compile_to_LLVM(
                     functions_and_signatures,
                     target_info,
                     pipeline_class=HeavyDBCompilerPipeline,
                     user_defined_llvm_ir=self.user_defined_llvm_ir.get(device),
-                    debug=self.debug)
+                    debug=self.debug,
+                    cache=self.instance_cache,
+                    stats=self.compile_stats)
 
                 assert llvm_module.triple == target_info.triple
                 assert llvm_module.data_layout == target_info.datalayout
                 for f in llvm_module.functions:
                     llvm_function_names.append(f.name)
 
-                device_ir_map[device] = str(llvm_module)
+                with self.compile_stats.record('serialize', device=target_info.name):
+                    device_ir_map[device] = str(llvm_module)
                 skipped_names = []
                 for fid, udf in udfs_map.items():
                     if fid in succesful_fids:
@@ -1247,11 +1258,13 @@ class RemoteHeavyDB(RemoteJIT):
         if self.debug:
             names = ", ".join([f.name for f in udfs] + [f.name for f in udtfs])
             print(f'Registering: {names}')
+            print(f'Instance cache: {self.instance_cache.stats()}')
 
         self.set_last_compile(device_ir_map)
-        return self.thrift_call(
-            'register_runtime_extension_functions',
-            self.session_id, udfs, udtfs, device_ir_map)
+        with self.compile_stats.record('register'):
+            return self.thrift_call(
+                'register_runtime_extension_functions',
+                self.session_id, udfs, udtfs, device_ir_map)
 
     def unregister(self):
         """Unregister caller cache locally and on the server."""
@@ -1395,7 +1408,8 @@ class RemoteHeavyDB(RemoteJIT):
         return typ.tostring(use_typename=use_typename, use_annotation_name=True)
 
     # We define remote_compile and remote_call for Caller.__call__ method.
-    def remote_compile(self, func, ftype: typesystem.Type, target_info: TargetInfo):
+    def remote_compile(self, func, ftype: typesystem.Type, target_info: TargetInfo,
+                       options=None):
         """Remote compile function and signatures to machine code.
 
         See RemoteJIT.remote_compile.__doc__.
@@ -1403,7 +1417,8 @@ class RemoteHeavyDB(RemoteJIT):
         if self.query_requires_register(func.__name__):
             self.register()
 
-    def remote_call(self, func, ftype: typesystem.Type, arguments: tuple, hold=False):
+    def remote_call(self, func, ftype: typesystem.Type, arguments: tuple, hold=False,
+                    options=None):
         """
         See RemoteJIT.remote_call.__doc__.
         """
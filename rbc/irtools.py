@@ -1,20 +1,28 @@
 # Author: Pearu Peterson
 # Created: February 2019
 
+import os
 import re
 import warnings
-from contextlib import contextmanager
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from collections import defaultdict
+import llvmlite
 from llvmlite import ir
 import llvmlite.binding as llvm
+import numba
 from .targetinfo import TargetInfo
 from .errors import UnsupportedError
-from .utils import get_version
+from .utils import get_version, UNSPECIFIED
 from . import libfuncs
+from . import cache as _cache
+from .stats import CompileStats
 from rbc import externals
 from numba.core import codegen, cpu, compiler_lock, \
     registry, typing, compiler, sigutils, cgutils, \
-    extending, imputils
+    extending, imputils, fastmathpass
 from numba.core import errors as nb_errors
 
 
@@ -22,45 +30,167 @@ int32_t = ir.IntType(32)
 int1_t = ir.IntType(1)
 
 
-def get_called_functions(library, funcname=None):
-    result = defaultdict(set)
-    module = library._final_module
-    if funcname is None:
-        for df in library.get_defined_functions():
-            for k, v in get_called_functions(library, df.name).items():
-                result[k].update(v)
-        return result
+_symbol_re = re.compile(r'@(?:"((?:[^"\\]|\\.)*)"|([-\w$.]+))')
+
+
+def _referenced_symbols(text):
+    return {m.group(1) if m.group(1) is not None else m.group(2)
+            for m in _symbol_re.finditer(text)}
+
+
+class CallGraph:
+    """Index of the symbols that the functions and global variables of
+    a library refer to.
 
-    func = module.get_function(funcname)
-    assert func.name == funcname, (func.name, funcname)
-    result['defined'].add(funcname)
-    for block in func.blocks:
-        for instruction in block.instructions:
-            if instruction.opcode == 'call':
-                name = list(instruction.operands)[-1].name
-                f = module.get_function(name)
-                if name.startswith('llvm.'):
-                    result['intrinsics'].add(name)
-                elif f.is_declaration:
-                    found = False
-                    for lib in library._linking_libraries:
-                        for df in lib.get_defined_functions():
-                            if name == df.name:
-                                result['defined'].add(name)
-                                result['libraries'].add(lib)
-                                found = True
-                                for k, v in get_called_functions(lib, name).items():
-                                    result[k].update(v)
-                                break
-                        if found:
-                            break
-                    if not found:
-                        result['declarations'].add(name)
+    The modules of the library and its linking libraries are scanned
+    once, and the transitive closures of the references are cached.
+    The index must be re-created when the modules are modified.
+
+    The closure of a symbol is a mapping with the following keys:
+
+    - ``defined``: defined functions
+    - ``declarations``: declared functions that are not defined in
+      linking libraries
+    - ``intrinsics``: LLVM intrinsic functions
+    - ``libraries``: linking libraries that define called functions
+    - ``globals``: global variables
+    """
+
+    def __init__(self, library):
+        self.library = library
+        self._indices = {}
+        self._closures = {}
+
+    def _index(self, library):
+        index = self._indices.get(library)
+        if index is None:
+            module = library._final_module
+            kinds, refs = {}, {}
+            for f in module.functions:
+                if f.is_declaration:
+                    kinds[f.name] = 'declaration'
                 else:
-                    result['defined'].add(name)
-                    for k, v in get_called_functions(library, name).items():
-                        result[k].update(v)
-    return result
+                    kinds[f.name] = 'function'
+                    refs[f.name] = _referenced_symbols(str(f))
+            for g in module.global_variables:
+                kinds[g.name] = 'global'
+                if not g.is_declaration:
+                    refs[g.name] = _referenced_symbols(str(g).split('=', 1)[-1])
+            index = self._indices[library] = kinds, refs
+        return index
+
+    def _resolve(self, library, name):
+        """Return linking library that defines a function.
+        """
+        for lib in library._linking_libraries:
+            if self._index(lib)[0].get(name) == 'function':
+                return lib
+
+    def called_functions(self, funcname=None, library=None):
+        """Return the closure of symbols that a function refers to. When
+        funcname is None, return the union of the closures of all
+        defined functions.
+        """
+        if library is None:
+            library = self.library
+        key = library, funcname
+        result = self._closures.get(key)
+        if result is not None:
+            return result
+        if funcname is not None:
+            return self._closure(key)
+        result = defaultdict(set)
+        for name, kind in self._index(library)[0].items():
+            if kind == 'function':
+                for k, v in self.called_functions(name, library).items():
+                    result[k].update(v)
+        self._closures[key] = result
+        return result
+
+    def _symbol(self, node):
+        """Return ``(category, value, targets)`` where value is added to
+        the category of the closures that contain the node, and targets
+        are the nodes that the node refers to.
+        """
+        lib, name = node
+        kinds, refs = self._index(lib)
+        kind = kinds.get(name)
+        if kind == 'function':
+            return 'defined', name, [(lib, n) for n in refs[name]]
+        if kind == 'global':
+            return 'globals', name, [(lib, n) for n in refs.get(name, ())]
+        if kind == 'declaration':
+            if name.startswith('llvm.'):
+                return 'intrinsics', name, []
+            owner = self._resolve(lib, name)
+            if owner is None:
+                return 'declarations', name, []
+            return 'libraries', owner, [(owner, name)]
+        # not a symbol of the module
+        return None, None, []
+
+    def _closure(self, root):
+        """Compute the closures of all nodes reachable from root.
+
+        The strongly connected components of the call graph are found
+        with Tarjan's algorithm. The nodes of a component share the
+        closure that is the union of the symbols of the component and
+        the closures of the components it refers to, hence every node
+        is visited once.
+        """
+        closures = self._closures
+        index, lowlink, symbols = {}, {}, {}
+        component, on_component = [], set()
+
+        def visit(node):
+            index[node] = lowlink[node] = len(index)
+            component.append(node)
+            on_component.add(node)
+            symbols[node] = self._symbol(node)
+            return node, iter(symbols[node][2])
+
+        work = [visit(root)]
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target in closures:
+                    continue
+                if target not in index:
+                    work.append(visit(target))
+                    break
+                if target in on_component:
+                    lowlink[node] = min(lowlink[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != index[node]:
+                    continue
+                members = []
+                while not members or members[-1] != node:
+                    members.append(component.pop())
+                    on_component.discard(members[-1])
+                result = defaultdict(set)
+                for member in members:
+                    category, value, member_targets = symbols[member]
+                    if category is not None:
+                        result[category].add(value)
+                    for target in member_targets:
+                        closure = closures.get(target)
+                        if closure is not None:
+                            for k, v in closure.items():
+                                result[k].update(v)
+                for member in members:
+                    closures[member] = result
+        return closures[root]
+
+
+def get_called_functions(library, funcname=None):
+    """Return the closure of symbols that a library function refers to.
+    See `CallGraph.called_functions`.
+    """
+    return CallGraph(library).called_functions(funcname)
 
 
 # ---------------------------------------------------------------------------
@@ -175,7 +305,8 @@ class JITRemoteTargetContext(cpu.CPUContext):
         return None
 
     def post_lowering(self, mod, library):
-        pass
+        if self.fastmath:
+            fastmathpass.rewrite_module(mod, self.fastmath)
 
 
 # ---------------------------------------------------------------------------
@@ -183,14 +314,70 @@ class JITRemoteTargetContext(cpu.CPUContext):
 
 
 @contextmanager
-def replace_numba_internals_hack():
+def replace_numba_internals_hack(codegen=None):
     # Hackish solution to prevent numba from calling _ensure_finalize. See issue #87
+    if codegen is None:
+        codegen = JITRemoteCodegen("numba.exec")
     _internal_codegen_bkp = registry.cpu_target.target_context._internal_codegen
-    registry.cpu_target.target_context._internal_codegen = JITRemoteCodegen("numba.exec")
+    registry.cpu_target.target_context._internal_codegen = codegen
     yield
     registry.cpu_target.target_context._internal_codegen = _internal_codegen_bkp
 
 
+# A pool of typing and target contexts, keyed by target info fingerprint
+_context_pool = {}
+_context_pool_lock = threading.Lock()
+
+
+def get_contexts(target_info: TargetInfo):
+    """Return typing and target contexts for given target device.
+
+    The contexts are created once per target info fingerprint and
+    reused in subsequent compilations. Use `invalidate_contexts` to
+    drop the warm contexts, for instance, after changing the numba
+    registries that the contexts have already installed.
+
+    Parameters
+    ----------
+    target_info : TargetInfo
+      Specify target device information. Must be the currently
+      active target info.
+
+    Returns
+    -------
+    typing_context : JITRemoteTypingContext
+    target_context : JITRemoteTargetContext
+    """
+    key = target_info.fingerprint
+    with _context_pool_lock:
+        contexts = _context_pool.get(key)
+        if contexts is None:
+            typing_context = JITRemoteTypingContext()
+            target_context = JITRemoteTargetContext(typing_context)
+
+            # Bring over Array overloads (a hack):
+            target_context._defns = registry.cpu_target.target_context._defns
+
+            contexts = _context_pool[key] = typing_context, target_context
+    return contexts
+
+
+def invalidate_contexts(target_info=None):
+    """Remove typing and target contexts from the context pool.
+
+    Parameters
+    ----------
+    target_info : {TargetInfo, None}
+      Specify target device of the contexts to be removed. When None,
+      all contexts are removed.
+    """
+    with _context_pool_lock:
+        if target_info is None:
+            _context_pool.clear()
+        else:
+            _context_pool.pop(target_info.fingerprint, None)
+
+
 def make_wrapper(fname, atypes, rtype, cres, target: TargetInfo, verbose=False):
     """Make wrapper function to numba compile result.
 
@@ -267,15 +454,128 @@ def make_wrapper(fname, atypes, rtype, cres, target: TargetInfo, verbose=False):
     cres.library.add_ir_module(module)
 
 
-def compile_instance(func, sig,
-                     target: TargetInfo,
-                     typing_context,
-                     target_context,
-                     pipeline_class,
-                     main_library,
-                     debug=False):
-    """Compile a function with given signature. Return function name when
-    succesful.
+_compile_cache = UNSPECIFIED
+
+
+def get_compile_cache():
+    """Return the persistent cache of compile_instance results.
+
+    The cache is enabled when the environment variable RBC_CACHE_DIR
+    is set, otherwise None is returned. Use `set_compile_cache` to
+    override the default cache.
+    """
+    global _compile_cache
+    if _compile_cache is UNSPECIFIED:
+        path = os.environ.get('RBC_CACHE_DIR')
+        if path:
+            max_size = int(os.environ.get('RBC_CACHE_MAX_SIZE', 2**28))
+            _compile_cache = _cache.DiskCache(path, max_size=max_size)
+        else:
+            _compile_cache = None
+    return _compile_cache
+
+
+def set_compile_cache(cache):
+    """Set the persistent cache of compile_instance results.
+
+    Parameters
+    ----------
+    cache : {DiskCache, str, None}
+      Specify cache instance or a path to cache directory. When None,
+      caching is disabled.
+    """
+    global _compile_cache
+    if isinstance(cache, str):
+        cache = _cache.DiskCache(cache)
+    _compile_cache = cache
+
+
+def get_instance_key(func_key, fname, args, return_type, target: TargetInfo,
+                     pipeline_class, debug=False, options=None):
+    """Return the cache key of a function instance.
+    """
+    from rbc import __version__ as rbc_version
+    return _cache.hashkey(
+        func_key, fname, tuple(map(str, args)), str(return_type),
+        target.fingerprint, f'{pipeline_class.__module__}.{pipeline_class.__qualname__}',
+        bool(debug), get_options_key(options), numba.__version__, llvmlite.__version__,
+        rbc_version)
+
+
+def get_options_key(options):
+    """Return hashable representation of compile options.
+    """
+    return tuple(sorted((k, repr(sorted(v) if isinstance(v, (set, frozenset)) else v))
+                        for k, v in (options or {}).items()))
+
+
+# Per-function compile options, see `optimize_instance_module`
+compile_options = ('opt_level', 'fastmath', 'loop_vectorize', 'slp_vectorize', 'unroll_loops')
+
+
+def check_compile_options(options):
+    """Check compile options. Return a dictionary of specified options.
+    """
+    options = {k: v for k, v in (options or {}).items() if v is not None}
+    for k, v in options.items():
+        if k not in compile_options:
+            raise ValueError(f'unknown compile option `{k}`,'
+                             f' expected one of {", ".join(compile_options)}')
+    opt_level = options.get('opt_level')
+    if opt_level is not None and opt_level not in (0, 1, 2, 3):
+        raise ValueError(f'opt_level must be 0, 1, 2, or 3, got {opt_level!r}')
+    return options
+
+
+def optimize_instance_module(codegen, module, options):
+    """Run module passes specified by compile options on function
+    instance module.
+
+    The options opt_level, loop_vectorize, and slp_vectorize default
+    to numba configuration, unroll_loops defaults to True. Notice that
+    the final module is optimized with the default pipeline, hence the
+    options that disable optimizations may be partially overridden.
+    """
+    opt_level = options.get('opt_level', numba.core.config.OPT)
+    pm = llvm.create_module_pass_manager()
+    codegen._tm.add_analysis_passes(pm)
+    with codegen._pass_manager_builder(
+            opt=opt_level,
+            loop_vectorize=options.get('loop_vectorize', numba.core.config.LOOP_VECTORIZE),
+            slp_vectorize=options.get('slp_vectorize', numba.core.config.SLP_VECTORIZE)) as pmb:
+        pmb.disable_unroll_loops = not options.get('unroll_loops', True)
+        pmb.populate(pm)
+    pm.run(module)
+
+
+def _defined_in(module, name):
+    try:
+        return not module.get_function(name).is_declaration
+    except NameError:
+        return False
+
+
+def _record(stats, phase, **kwargs):
+    if stats is None:
+        return nullcontext()
+    return stats.record(phase, **kwargs)
+
+
+def _compile_instance_module(func, sig,
+                             target: TargetInfo,
+                             typing_context,
+                             target_context,
+                             pipeline_class,
+                             main_library,
+                             debug=False,
+                             cache=None,
+                             func_key=None,
+                             options=None,
+                             stats=None):
+    """Compile a function with given signature to a separate LLVM module.
+
+    Return a 3-tuple ``(fname, module, declarations)`` or None when the
+    function instance is skipped. Used internally.
     """
     flags = compiler.Flags()
     if get_version('numba') >= (0, 54):
@@ -286,20 +586,39 @@ def compile_instance(func, sig,
         flags.set('no_compile')
         flags.set('no_cpython_wrapper')
         flags.set('no_cfunc_wrapper')
+    options = options or {}
+    if options.get('fastmath'):
+        flags.fastmath = options['fastmath']
 
     fname = func.__name__ + sig.mangling()
     args, return_type = sigutils.normalize_signature(
         sig.tonumba(bool_is_int8=True))
+    main_module = main_library._final_module
+    info = dict(function=func.__name__, signature=str(sig), device=target.name)
+
+    if cache is not None:
+        with _record(stats, 'cache.get', **info):
+            if func_key is None:
+                func_key = _cache.function_key(func)
+            key = get_instance_key(func_key, fname, args, return_type, target,
+                                   pipeline_class, debug=debug, options=options)
+            entry = cache.get(key)
+            if entry is not None:
+                bitcode, declarations = entry
+                return fname, llvm.parse_bitcode(bitcode), declarations
+
+    library = main_library.codegen.create_library(f'{main_library.name}.{fname}')
     try:
-        cres = compiler.compile_extra(typingctx=typing_context,
-                                      targetctx=target_context,
-                                      func=func,
-                                      args=args,
-                                      return_type=return_type,
-                                      flags=flags,
-                                      library=main_library,
-                                      locals={},
-                                      pipeline_class=pipeline_class)
+        with _record(stats, 'numba', **info):
+            cres = compiler.compile_extra(typingctx=typing_context,
+                                          targetctx=target_context,
+                                          func=func,
+                                          args=args,
+                                          return_type=return_type,
+                                          flags=flags,
+                                          library=library,
+                                          locals={},
+                                          pipeline_class=pipeline_class)
     except (UnsupportedError, nb_errors.TypingError, nb_errors.LoweringError) as msg:
         for m in re.finditer(r'UnsupportedError(.*?)\n', str(msg), re.S):
             warnings.warn(f'Skipping {fname}:{m.group(0)[18:]}')
@@ -310,10 +629,14 @@ def compile_instance(func, sig,
     except Exception:
         raise
 
-    result = get_called_functions(cres.library, cres.fndesc.llvm_func_name)
+    if stats is not None:
+        stats.add_numba_timings(cres.metadata, **info)
+
+    with _record(stats, 'call_graph', **info):
+        result = CallGraph(cres.library).called_functions(cres.fndesc.llvm_func_name)
 
     for f in result['declarations']:
-        if target.supports(f):
+        if target.supports(f) or _defined_in(main_module, f):
             continue
         warnings.warn(f'Skipping {fname} that uses undefined function `{f}`')
         return
@@ -332,17 +655,73 @@ def compile_instance(func, sig,
         warnings.warn(f'Skipping {fname} that uses unsupported intrinsic `{f}`')
         return
 
-    make_wrapper(fname, args, return_type, cres, target, verbose=debug)
+    with _record(stats, 'make_wrapper', **info):
+        make_wrapper(fname, args, return_type, cres, target, verbose=debug)
 
-    main_module = main_library._final_module
-    for lib in result['libraries']:
-        main_module.link_in(
-            lib._get_module_for_linking(), preserve=True,
-        )
+    instance_module = library._final_module
+    with _record(stats, 'link_libraries', **info):
+        for lib in result['libraries']:
+            instance_module.link_in(
+                lib._get_module_for_linking(), preserve=True,
+            )
+    if options:
+        with _record(stats, 'optimize_instance', **info):
+            optimize_instance_module(main_library.codegen, instance_module, options)
+
+    declarations = sorted(result['declarations'])
+    if cache is not None:
+        with _record(stats, 'cache.set', **info):
+            cache.set(key, (instance_module.as_bitcode(), declarations))
+
+    return fname, instance_module, declarations
 
+
+def _link_instance_module(main_library, fname, module, declarations,
+                          target: TargetInfo, stats=None):
+    """Link function instance module into the main library. Return
+    function name when succesful. Used internally.
+    """
+    main_module = main_library._final_module
+    for f in declarations:
+        if not (target.supports(f) or _defined_in(main_module, f)):
+            warnings.warn(f'Skipping {fname} that uses undefined function `{f}`')
+            return
+    with _record(stats, 'link', function=fname, device=target.name):
+        main_module.link_in(module, preserve=True)
     return fname
 
 
+def compile_instance(func, sig,
+                     target: TargetInfo,
+                     typing_context,
+                     target_context,
+                     pipeline_class,
+                     main_library,
+                     debug=False,
+                     cache=None,
+                     func_key=None,
+                     options=None,
+                     stats=None):
+    """Compile a function with given signature. Return function name when
+    succesful.
+
+    The function instance is compiled to a separate library whose
+    module is linked into the main library. When cache is specified, the
+    instance module is stored in cache as LLVM bitcode and the
+    subsequent compilations of the same instance are loaded from
+    the cache. The options specify per-function compile options, see
+    `compile_options`. When stats is specified, the timings of compile
+    phases are recorded to stats, see `CompileStats`.
+    """
+    r = _compile_instance_module(func, sig, target, typing_context,
+                                 target_context, pipeline_class, main_library,
+                                 debug=debug, cache=cache, func_key=func_key,
+                                 options=options, stats=stats)
+    if r is None:
+        return
+    return _link_instance_module(main_library, *r, target, stats=stats)
+
+
 def add_metadata_flag(main_library, **kwargs):
     module = ir.Module()
     mflags = module.add_named_metadata('llvm.module.flags')
@@ -353,23 +732,168 @@ def add_metadata_flag(main_library, **kwargs):
     main_library.add_ir_module(module)
 
 
+def _create_main_library(codegen, user_defined_llvm_ir=None):
+    main_library = codegen.create_library('rbc.irtools.compile_to_IR')
+    if user_defined_llvm_ir is not None:
+        if isinstance(user_defined_llvm_ir, str):
+            user_defined_llvm_ir = llvm.parse_assembly(user_defined_llvm_ir)
+        assert isinstance(user_defined_llvm_ir, llvm.ModuleRef)
+        main_library._final_module.link_in(user_defined_llvm_ir, preserve=True)
+    return main_library
+
+
+# The arguments of compile_to_LLVM that worker processes inherit from
+# the parent process
+_parallel_job = None
+
+
+def _compile_chunk(chunk):
+    """Compile a chunk of function instances in a worker process.
+
+    Return a list of ``(fid, fname, bitcode, declarations)`` tuples, a
+    list of ``(message, category)`` pairs of the issued warnings, and a
+    list of stats records. Used internally.
+    """
+    (functions_and_signatures, func_keys, target_info, pipeline_class,
+     user_defined_llvm_ir, debug, cache, record_stats) = _parallel_job
+    stats = CompileStats() if record_stats else None
+    # The forked worker inherits the active target info and the
+    # replaced numba internals from the parent process
+    typing_context, target_context = get_contexts(target_info)
+    results = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        main_library = _create_main_library(target_context.codegen(), user_defined_llvm_ir)
+        for i, fid in chunk:
+            func, signatures, options = functions_and_signatures[i]
+            r = _compile_instance_module(func, signatures[fid], target_info,
+                                         typing_context, target_context,
+                                         pipeline_class, main_library,
+                                         debug=debug, cache=cache,
+                                         func_key=func_keys[i],
+                                         options=options.get(fid),
+                                         stats=stats)
+            if r is not None:
+                fname, module, declarations = r
+                results.append((fid, fname, module.as_bitcode(), declarations))
+    records = list(stats.records) if stats is not None else []
+    return results, [(str(w.message), w.category) for w in caught], records
+
+
+def _compile_parallel(instances, workers, job, stats=None):
+    """Compile function instances in worker processes. Return a list
+    of ``(fid, fname, bitcode, declarations)`` tuples in the order of
+    instances. Used internally.
+    """
+    global _parallel_job
+    chunksize = max(1, len(instances) // (4 * workers))
+    chunks = [instances[i:i + chunksize] for i in range(0, len(instances), chunksize)]
+    results = []
+    _parallel_job = job
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context('fork')) as executor:
+            for chunk_results, caught, records in executor.map(_compile_chunk, chunks):
+                for message, category in caught:
+                    warnings.warn(message, category)
+                results.extend(chunk_results)
+                if stats is not None:
+                    stats.extend(records)
+    finally:
+        _parallel_job = None
+    return results
+
+
+def prune_module(library, function_names, user_functions=()):
+    """Mark unused symbols of library module for removal.
+
+    The functions other than the given functions become internal so
+    that the final optimization inlines and removes these when
+    possible. The user-defined functions that are used keep their
+    linkage. Unused global variables become private. Unused
+    declarations and named struct types are dropped by the final
+    optimization.
+
+    Parameters
+    ----------
+    library : CodeLibrary
+      Specify library whose final module is pruned.
+    function_names : list
+      Specify the names of exported functions.
+    user_functions : set
+      Specify the names of user-defined functions.
+    """
+    module = library._final_module
+    call_graph = CallGraph(library)
+    used_symbols = defaultdict(set)
+    for fname in function_names:
+        for k, v in call_graph.called_functions(fname).items():
+            used_symbols[k].update(v)
+
+    exported = set(function_names)
+    for f in module.functions:
+        if f.is_declaration or f.name in exported:
+            continue
+        if f.name in user_functions and f.name in used_symbols['defined']:
+            continue
+        f.linkage = llvm.Linkage.internal
+
+    for g in module.global_variables:
+        if g.is_declaration or g.name.startswith('llvm.'):
+            continue
+        if g.name not in used_symbols['globals']:
+            g.linkage = llvm.Linkage.private
+
+
+def get_module_size(module):
+    """Return the numbers of functions, global variables, and named struct
+    types, and the size of IR in bytes of a LLVM module.
+    """
+    functions = list(module.functions)
+    return dict(
+        functions=sum(not f.is_declaration for f in functions),
+        declarations=sum(f.is_declaration for f in functions),
+        globals=len(list(module.global_variables)),
+        struct_types=len(list(module.struct_types)),
+        bytes=len(str(module)))
+
+
 def compile_to_LLVM(functions_and_signatures,
                     target_info: TargetInfo,
                     pipeline_class=compiler.Compiler,
                     user_defined_llvm_ir=None,
-                    debug=False):
+                    debug=False,
+                    cache=UNSPECIFIED,
+                    workers=None,
+                    stats=None):
     """Compile functions with given signatures to target specific LLVM IR.
 
     Parameters
     ----------
     functions_and_signatures : list
-      Specify a list of Python function and its signatures pairs.
+      Specify a list of Python function and its signatures pairs. The
+      signatures is a mapping of function ids and signatures. An item
+      of the list may contain a third element that maps function ids
+      to compile options, see `compile_options`.
     target : TargetInfo
       Specify target device information.
     user_defined_llvm_ir : {None, str, ModuleRef}
       Specify user-defined LLVM IR module that is linked in to the
       returned module.
     debug : bool
+    cache : {DiskCache, None}
+      Specify the cache of compiled function instances. By default,
+      the cache returned by `get_compile_cache()` is used.
+    workers : {int, None}
+      Specify the number of worker processes that compile function
+      instances in parallel. Zero means the number of CPUs. By
+      default, the value of the environment variable
+      RBC_COMPILE_WORKERS is used, otherwise the functions are
+      compiled in the current process. Parallel compilation requires
+      the fork start method of multiprocessing.
+    stats : {CompileStats, None}
+      Specify the instrumentation object that records the timings of
+      compile phases of functions and signatures.
 
     Returns
     -------
@@ -377,33 +901,57 @@ def compile_to_LLVM(functions_and_signatures,
       LLVM module instance. To get the IR string, use `str(module)`.
 
     """
-    target_desc = registry.cpu_target
-
-    typing_context = JITRemoteTypingContext()
-    target_context = JITRemoteTargetContext(typing_context)
-
-    # Bring over Array overloads (a hack):
-    target_context._defns = target_desc.target_context._defns
-
-    with replace_numba_internals_hack():
-        codegen = target_context.codegen()
-        main_library = codegen.create_library('rbc.irtools.compile_to_IR')
+    if cache is UNSPECIFIED:
+        cache = get_compile_cache()
+
+    typing_context, target_context = get_contexts(target_info)
+    codegen = target_context.codegen()
+
+    if workers is None:
+        workers = int(os.environ.get('RBC_COMPILE_WORKERS', 1))
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    functions_and_signatures = [item if len(item) == 3 else (item + ({},))
+                                for item in map(tuple, functions_and_signatures)]
+    instances = [(i, fid) for i, (func, signatures, _) in enumerate(functions_and_signatures)
+                 for fid in signatures]
+    parallel = (workers > 1 and len(instances) > 1
+                and 'fork' in multiprocessing.get_all_start_methods())
+
+    with replace_numba_internals_hack(codegen), \
+         _record(stats, 'compile_to_LLVM', device=target_info.name):
+        main_library = _create_main_library(codegen, user_defined_llvm_ir)
         main_module = main_library._final_module
+        user_functions = {f.name for f in main_module.functions if not f.is_declaration}
 
-        if user_defined_llvm_ir is not None:
-            if isinstance(user_defined_llvm_ir, str):
-                user_defined_llvm_ir = llvm.parse_assembly(user_defined_llvm_ir)
-            assert isinstance(user_defined_llvm_ir, llvm.ModuleRef)
-            main_module.link_in(user_defined_llvm_ir, preserve=True)
+        func_keys = [_cache.function_key(func) if cache is not None else None
+                     for func, _, _ in functions_and_signatures]
 
         succesful_fids = []
         function_names = []
-        for func, signatures in functions_and_signatures:
-            for fid, sig in signatures.items():
-                fname = compile_instance(func, sig, target_info, typing_context,
+        if parallel:
+            job = (functions_and_signatures, func_keys, target_info, pipeline_class,
+                   user_defined_llvm_ir, debug, cache, stats is not None)
+            for fid, fname, bitcode, declarations in _compile_parallel(
+                    instances, workers, job, stats=stats):
+                fname = _link_instance_module(main_library, fname,
+                                              llvm.parse_bitcode(bitcode),
+                                              declarations, target_info, stats=stats)
+                if fname is not None:
+                    succesful_fids.append(fid)
+                    function_names.append(fname)
+        else:
+            for i, fid in instances:
+                func, signatures, options = functions_and_signatures[i]
+                fname = compile_instance(func, signatures[fid], target_info, typing_context,
                                          target_context, pipeline_class,
                                          main_library,
-                                         debug=debug)
+                                         debug=debug,
+                                         cache=cache,
+                                         func_key=func_keys[i],
+                                         options=options.get(fid),
+                                         stats=stats)
                 if fname is not None:
                     succesful_fids.append(fid)
                     function_names.append(fname)
@@ -411,46 +959,21 @@ def compile_to_LLVM(functions_and_signatures,
         add_metadata_flag(main_library,
                           pass_column_arguments_by_value=0,
                           manage_memory_buffer=1)
-        main_library._optimize_final_module()
-
-        # Remove unused defined functions and declarations
-        used_symbols = defaultdict(set)
-        for fname in function_names:
-            for k, v in get_called_functions(main_library, fname).items():
-                used_symbols[k].update(v)
-
-        all_symbols = get_called_functions(main_library)
-
-        unused_symbols = defaultdict(set)
-        for k, lst in all_symbols.items():
-            if k == 'libraries':
-                continue
-            for fn in lst:
-                if fn not in used_symbols[k]:
-                    unused_symbols[k].add(fn)
-
-        changed = False
-        for f in main_module.functions:
-            fn = f.name
-            if fn.startswith('llvm.'):
-                if f.name in unused_symbols['intrinsics']:
-                    f.linkage = llvm.Linkage.external
-                    changed = True
-            elif f.is_declaration:
-                if f.name in unused_symbols['declarations']:
-                    f.linkage = llvm.Linkage.external
-                    changed = True
-            else:
-                if f.name in unused_symbols['defined']:
-                    f.linkage = llvm.Linkage.private
-                    changed = True
-
-        # TODO: determine unused global_variables and struct_types
 
-        if changed:
+        if debug:
+            size_before = get_module_size(main_module)
+        with _record(stats, 'prune', device=target_info.name):
+            prune_module(main_library, function_names, user_functions)
+        with _record(stats, 'optimize', device=target_info.name):
             main_library._optimize_final_module()
-
-        main_module.verify()
+        if debug:
+            size_after = get_module_size(main_module)
+            print('compile_to_LLVM: IR size before/after pruning and optimization:')
+            for k, v in size_before.items():
+                print(f'  {k}: {v} -> {size_after[k]}')
+
+        with _record(stats, 'verify', device=target_info.name):
+            main_module.verify()
         main_library._finalized = True
         main_module.triple = target_info.triple
         main_module.data_layout = target_info.datalayout
@@ -458,13 +981,178 @@ def compile_to_LLVM(functions_and_signatures,
     return main_module, succesful_fids
 
 
+def parse_IR(ir):
+    """Return verified LLVM module from LLVM IR string or LLVM bitcode.
+    """
+    if isinstance(ir, bytes):
+        mod = llvm.parse_bitcode(ir)
+    else:
+        mod = llvm.parse_assembly(ir)
+    mod.verify()
+    return mod
+
+
+def create_execution_engine(triple):
+    """Return an empty execution engine for given target triple.
+    When the triple is empty, the host triple is used.
+
+    Use `add_module` method to compile modules into the engine.
+    """
+    llvm.initialize()
+    llvm.initialize_all_targets()
+    llvm.initialize_all_asmprinters()
+
+    target = llvm.Target.from_triple(triple or llvm.get_process_triple())
+    target_machine = target.create_target_machine()
+    backing_mod = llvm.parse_assembly("")
+    return llvm.create_mcjit_compiler(backing_mod, target_machine)
+
+
+def add_module(engine, mod):
+    """Compile LLVM module into execution engine.
+    """
+    engine.add_module(mod)
+    engine.finalize_object()
+    try:
+        mod.get_global_variable('llvm.global_ctors')
+    except NameError:
+        pass
+    else:
+        engine.run_static_constructors()
+
+
+def get_object_key(ir, triple, name=None):
+    """Return the cache key of object code compiled from LLVM IR string
+    or LLVM bitcode for the host CPU.
+
+    Parameters
+    ----------
+    ir : {str, bytes}
+      Specify LLVM IR string or LLVM bitcode.
+    triple : str
+      Specify target triple of the module.
+    name : {str, None}
+      Specify the name of the function when the object code contains
+      only the named function, see `extract_function_module`.
+    """
+    return _cache.hashkey('object', ir, triple, name, llvm.get_host_cpu_name(),
+                          llvm.get_host_cpu_features().flatten(), llvmlite.__version__)
+
+
+def get_defined_symbols(mod):
+    """Return the names of functions and global variables that are
+    defined in LLVM module and are visible outside of the module.
+    """
+    local = (llvm.Linkage.internal, llvm.Linkage.private)
+    return [v.name for v in list(mod.functions) + list(mod.global_variables)
+            if not v.is_declaration and v.linkage not in local]
+
+
+_constant_re = re.compile(r'@\S+\s*=\s*([\w()]+\s+)*constant\b')
+
+
+def extract_function_module(ir, name):
+    """Return LLVM module that contains the named function and its
+    dependencies from LLVM IR string or LLVM bitcode. Other functions
+    are internalized and removed when not used.
+
+    Returns None when the module defines exported global variables
+    that are not constants because internalizing these would create
+    copies of the variables.
+    """
+    mod = parse_IR(ir)
+    local = (llvm.Linkage.internal, llvm.Linkage.private)
+    for g in mod.global_variables:
+        if g.is_declaration or g.linkage in local or g.name.startswith('llvm.'):
+            continue
+        if not _constant_re.match(str(g)):
+            return
+        g.linkage = llvm.Linkage.internal
+    for f in mod.functions:
+        if f.is_declaration or f.linkage in local or f.name == name:
+            continue
+        f.linkage = llvm.Linkage.internal
+    pm = llvm.create_module_pass_manager()
+    pm.add_global_dce_pass()
+    pm.run(mod)
+    return mod
+
+
+_map_scalar_types = dict(
+    i1=ir.IntType(1), i8=ir.IntType(8), i16=ir.IntType(16), i32=ir.IntType(32),
+    i64=ir.IntType(64), float=ir.FloatType(), double=ir.DoubleType())
+
+
+def make_map_function(mod, name):
+    """Return LLVM IR of a function that applies the named function of
+    module `mod` to arrays of arguments in a loop. The generated
+    function has the signature::
+
+      void <name>.map(i64 n, i8** arguments, i8* result)
+
+    where `arguments` holds the pointers to `n`-element arrays of
+    arguments and `result` points to the `n`-element array of results.
+    Booleans are stored as bytes.
+
+    Returns None when the function has non-scalar arguments or return
+    value.
+    """
+    fn = mod.get_function(name)
+    rtype = _map_scalar_types.get(str(fn.type.element_type).split(' (', 1)[0])
+    atypes = [_map_scalar_types.get(str(a.type)) for a in fn.arguments]
+    if rtype is None or None in atypes:
+        return
+
+    def storage_type(t):
+        return ir.IntType(8) if t == int1_t else t
+
+    int64_t = ir.IntType(64)
+    int8p_t = ir.IntType(8).as_pointer()
+    module = ir.Module()
+    module.triple = mod.triple
+    module.data_layout = mod.data_layout
+    callee = ir.Function(module, ir.FunctionType(rtype, atypes), name)
+    wrapper = ir.Function(module, ir.FunctionType(
+        ir.VoidType(), [int64_t, int8p_t.as_pointer(), int8p_t]), name + '.map')
+    n, arguments, result = wrapper.args
+    entry = wrapper.append_basic_block('entry')
+    loop = wrapper.append_basic_block('loop')
+    done = wrapper.append_basic_block('done')
+
+    builder = ir.IRBuilder(entry)
+    ptrs = [builder.bitcast(builder.load(builder.gep(arguments, [int64_t(k)])),
+                            storage_type(t).as_pointer())
+            for k, t in enumerate(atypes)]
+    rptr = builder.bitcast(result, storage_type(rtype).as_pointer())
+    builder.cbranch(builder.icmp_signed('>', n, int64_t(0)), loop, done)
+
+    builder.position_at_end(loop)
+    i = builder.phi(int64_t)
+    i.add_incoming(int64_t(0), entry)
+    args = []
+    for ptr, t in zip(ptrs, atypes):
+        value = builder.load(builder.gep(ptr, [i]))
+        args.append(builder.icmp_unsigned('!=', value, value.type(0)) if t == int1_t else value)
+    value = builder.call(callee, args)
+    if rtype == int1_t:
+        value = builder.zext(value, ir.IntType(8))
+    builder.store(value, builder.gep(rptr, [i]))
+    inext = builder.add(i, int64_t(1))
+    i.add_incoming(inext, loop)
+    builder.cbranch(builder.icmp_signed('<', inext, n), loop, done)
+
+    builder.position_at_end(done)
+    builder.ret_void()
+    return str(module)
+
+
 def compile_IR(ir):
     """Return execution engine with IR compiled in.
 
     Parameters
     ----------
-    ir : str
-      Specify LLVM IR code as a string.
+    ir : {str, bytes}
+      Specify LLVM IR code as a string or LLVM bitcode as bytes.
 
     Returns
     -------
@@ -479,27 +1167,9 @@ def compile_IR(ir):
 
           addr = engine.get_function_address("<function name>")
     """
-    triple = re.search(
-        r'target\s+triple\s*=\s*"(?P<triple>[-\d\w\W_]+)"\s*$',
-        ir, re.M).group('triple')
-
-    # Create execution engine
-    llvm.initialize()
-    llvm.initialize_all_targets()
-    llvm.initialize_all_asmprinters()
-
-    target = llvm.Target.from_triple(triple)
-    target_machine = target.create_target_machine()
-    backing_mod = llvm.parse_assembly("")
-    engine = llvm.create_mcjit_compiler(backing_mod, target_machine)
-
-    # Create LLVM module and compile
-    mod = llvm.parse_assembly(ir)
-    mod.verify()
-    engine.add_module(mod)
-    engine.finalize_object()
-    engine.run_static_constructors()
-
+    mod = parse_IR(ir)
+    engine = create_execution_engine(mod.triple)
+    add_module(engine, mod)
     return engine
 
 
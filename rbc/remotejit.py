@@ -7,13 +7,26 @@ import os
 import inspect
 import warnings
 import ctypes
+import _ctypes
+import json
+import asyncio
+import itertools
+import threading
+import numpy as np
 from collections import defaultdict
-from . import irtools
+from . import irtools, shared_memory
 from .errors import UnsupportedError
-from .typesystem import Type, get_signature
-from .thrift import Server, Dispatcher, dispatchermethod, Data, Client
+from .typesystem import Type, get_signature, _python_imap, _numpy_imap
+from .thrift import Server, Dispatcher, dispatchermethod, Data, NDArray, Client, AsyncClient
 from .utils import get_local_ip, UNSPECIFIED
 from .targetinfo import TargetInfo
+from .stats import CompileStats
+from .cache import MemoryCache, hashkey
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 def isfunctionlike(obj):
@@ -46,7 +59,7 @@ def extract_templates(options):
       correspond to a concrete type.
 
     """
-    known_options = ['devices', 'local']
+    known_options = ['devices', 'local'] + list(irtools.compile_options)
     new_options = {}
     templates = options.get('templates')
     if templates is not None:
@@ -99,6 +112,13 @@ class Signature:
         self.signatures = []
         self.signature_devices = {}
         self.signature_templates = {}
+        self.signature_options = {}
+        # Maps (func, target_info, aliases) to normalized Signature,
+        # see `normalized`
+        self._normalized_cache = {}
+        # Incremented when signatures are changed, see
+        # `RemoteDispatcher.__call__`
+        self.version = 0
 
     @property
     def debug(self):
@@ -108,6 +128,7 @@ class Signature:
     def local(self):
         sig = Signature(self.remotejit.local)
         sig.signatures.extend(self.signatures)
+        sig.signature_options.update(self.signature_options)
         assert not self.signature_devices
         assert not self.signature_templates
         return sig
@@ -124,6 +145,8 @@ class Signature:
             devices = self.signature_devices.get(t, [])
             if devices:
                 s += f', device={"|".join(devices)}'
+            for k, v in self.signature_options.get(t, {}).items():
+                s += f', {k}={v}'
             lst.append(repr(s))
         return f'{"; ".join(lst)}'
 
@@ -141,6 +164,9 @@ class Signature:
           Specify device names for the given set of signatures.
         templates : dict
           Specify template types mapping.
+        opt_level, fastmath, loop_vectorize, slp_vectorize, unroll_loops
+          Specify compile options for the given set of signatures, see
+          `RemoteJIT.__call__`.
 
         Returns
         -------
@@ -161,13 +187,21 @@ class Signature:
             return self
         options, templates = extract_templates(options)
         devices = options.get('devices')
+        compile_options = irtools.check_compile_options(
+            {k: options.get(k) for k in irtools.compile_options})
         if isinstance(obj, Signature):
+            self._changed()
             self.signatures.extend(obj.signatures)
             self.signature_devices.update(obj.signature_devices)
+            self.signature_options.update(obj.signature_options)
             self.remotejit.discard_last_compile()
             if devices is not None:
                 for s in obj.signatures:
                     self.signature_devices[s] = devices
+            if compile_options:
+                for s in obj.signatures:
+                    self.signature_options[s] = dict(
+                        self.signature_options.get(s, {}), **compile_options)
             assert not templates
             for s in obj.signatures:
                 t = obj.signature_templates.get(s)
@@ -182,19 +216,24 @@ class Signature:
             final(obj.signature)  # copies the signatures from obj to final
             assert devices is None
             assert not templates
+            assert not compile_options
             return Caller(obj.func, final)
         if isfunctionlike(obj):
             final = Signature(self.remotejit)
             final(self)  # copies the signatures from self to final
             assert devices is None
             assert not templates
+            assert not compile_options
             return Caller(obj, final)
+        self._changed()
         self.signatures.append(obj)
         self.remotejit.discard_last_compile()
         if devices is not None:
             self.signature_devices[obj] = devices
         if templates:
             self.signature_templates[obj] = templates
+        if compile_options:
+            self.signature_options[obj] = compile_options
         return self
 
     def best_match(self, func, atypes: tuple) -> Type:
@@ -227,9 +266,16 @@ class Signature:
                     match_penalty = penalty
         return ftype, match_penalty
 
-    def add(self, sig):
+    def _changed(self):
+        self._normalized_cache.clear()
+        self.version += 1
+
+    def add(self, sig, options=None):
+        self._changed()
         if sig not in self.signatures:
             self.signatures.append(sig)
+        if options:
+            self.signature_options[sig] = options
 
     def normalized(self, func=None):
         """Return a copy of Signature object where all signatures are
@@ -244,13 +290,23 @@ class Signature:
         Returns
         -------
         signature : Signature
+          The result is cached per function, target device, and type
+          aliases, and must not be modified.
         """
+        target_info = TargetInfo()
+        key = func, target_info, tuple(sorted(Type.aliases.items()))
+        signature = self._normalized_cache.get(key)
+        if signature is None:
+            signature = self._normalized_cache[key] = self._normalized(func, target_info)
+        return signature
+
+    def _normalized(self, func, target_info):
         signature = Signature(self.remotejit)
         fsig = Type.fromcallable(func) if func is not None else None
         nargs = fsig.arity if func is not None else None
-        target_info = TargetInfo()
         for sig in self.signatures:
             devices = self.signature_devices.get(sig)
+            options = self.signature_options.get(sig)
             if not target_info.check_enabled(devices):
                 if self.debug:
                     print(f'{type(self).__name__}.normalized: skipping {sig} as'
@@ -277,10 +333,10 @@ class Signature:
                 for csig in sig.apply_templates(templates):
                     assert isinstance(csig, Type), (sig, csig, type(csig))
                     csig = self.remotejit.normalize_function_type(csig)
-                    signature.add(csig)
+                    signature.add(csig, options=options)
             else:
                 sig = self.remotejit.normalize_function_type(sig)
-                signature.add(sig)
+                signature.add(sig, options=options)
         if fsig is not None and fsig.is_complete:
             fsig = self.remotejit.normalize_function_type(fsig)
             signature.add(fsig)
@@ -314,6 +370,7 @@ class Caller:
 
         # Attributes used in RBC user-interface
         self._is_compiled = set()  # items are (fname, ftype)
+        self._compile_tasks = {}  # pending aremote_compile tasks
         self._client = None
 
         self.remotejit.add_caller(self)
@@ -350,16 +407,18 @@ class Caller:
             with Type.alias(**self.remotejit.typesystem_aliases):
                 with target_info:
                     lst.append(f'{device:-^80}')
-                    signatures = self.get_signatures()
-                    signatures_map = {}
-                    for sig in signatures:
+                    signature = self.signature.normalized(self.func)
+                    signatures_map, options_map = {}, {}
+                    for sig in signature.signatures:
                         fid += 1
                         signatures_map[fid] = sig
+                        options_map[fid] = signature.signature_options.get(sig)
                     llvm_module, succesful_fids = irtools.compile_to_LLVM(
-                        [(self.func, signatures_map)],
+                        [(self.func, signatures_map, options_map)],
                         target_info,
                         pipeline_class=HeavyDBCompilerPipeline,
-                        debug=self.remotejit.debug)
+                        debug=self.remotejit.debug,
+                        stats=self.remotejit.compile_stats)
                     lst.append(str(llvm_module))
         lst.append(f'{"":-^80}')
         return '\n'.join(lst)
@@ -369,6 +428,12 @@ class Caller:
         """
         return self.signature.normalized(self.func).signatures
 
+    def get_compile_options(self, ftype):
+        """Return compile options of a normalized signature for given
+        target device.
+        """
+        return self.signature.normalized(self.func).signature_options.get(ftype, {})
+
     # RBC user-interface
 
     def __call__(self, *arguments, device=UNSPECIFIED, hold=UNSPECIFIED):
@@ -377,6 +442,19 @@ class Caller:
         caller = self.remotejit.get_caller(self.func.__name__)
         return caller(*arguments, device=device, hold=hold)
 
+    async def acall(self, *arguments, device=UNSPECIFIED):
+        """Coroutine version of `__call__`.
+        """
+        caller = self.remotejit.get_caller(self.func.__name__)
+        return await caller.acall(*arguments, device=device)
+
+    def map(self, arguments, device=UNSPECIFIED, chunksize=UNSPECIFIED):
+        """Return a NumPy array of the results of remote JIT compiled
+        function calls on an iterable of argument tuples.
+        """
+        caller = self.remotejit.get_caller(self.func.__name__)
+        return caller.map(arguments, device=device, chunksize=chunksize)
+
 
 class RemoteDispatcher:
     """A collection of Caller instances holding functions with a common name.
@@ -386,6 +464,17 @@ class RemoteDispatcher:
         assert callers  # at least one caller must be specified
         self.remotejit = callers[0].remotejit
         self.callers = callers
+        # Maps dispatch keys to resolved (device, caller, ftype)
+        # triples, see RemoteJIT.get_dispatch_key
+        self._dispatch_table = {}
+        self._dispatch_targets = None
+        self._dispatch_versions = None
+
+    def add_caller(self, caller):
+        """Add a caller and invalidate the dispatch table.
+        """
+        self.callers.append(caller)
+        self._dispatch_table.clear()
 
     def __repr__(self):
         lst = [str(caller.signature) for caller in self.callers]
@@ -400,10 +489,42 @@ class RemoteDispatcher:
 
         If `hold` is True, return an object that encapsulates the
         remote call to postpone the remote execution.
+
+        When some of the arguments are NumPy arrays, the function is
+        applied element-wise to the broadcasted arguments, see
+        `RemoteJIT.remote_call_vectorized`. The function overload is
+        resolved from the dtypes of the arrays. Element-wise calls
+        cannot be held.
         """
         if hold is UNSPECIFIED:
             hold = self.remotejit.default_remote_call_hold
 
+        if any(isinstance(a, np.ndarray) for a in arguments):
+            if hold:
+                raise UnsupportedError(
+                    f'cannot hold element-wise call of `{self.name}` on arrays,'
+                    f' use hold=False')
+            arrays = np.broadcast_arrays(*map(np.asarray, arguments))
+            capsule = self(*[a.dtype.type(0) for a in arrays], device=device, hold=True)
+            return capsule.execute_vectorized(arrays)
+
+        targets = self.remotejit.targets
+        versions = tuple(caller.signature.version for caller in self.callers)
+        if self._dispatch_targets is not targets or self._dispatch_versions != versions:
+            # targets have been refreshed or signatures have been changed
+            self._dispatch_table.clear()
+            self._dispatch_targets = targets
+            self._dispatch_versions = versions
+        key = self.remotejit.get_dispatch_key(*arguments)
+        if key is not None:
+            key = device, key
+            entry = self._dispatch_table.get(key)
+            if entry is not None:
+                device_, caller, ftype = entry
+                r = self.remotejit.remote_call_capsule_cls(
+                    caller, targets[device_], ftype, arguments)
+                return r if hold else r.execute()
+
         penalty_device_caller_ftype = []
         atypes = None
         for device_, target_info in self.remotejit.targets.items():
@@ -442,10 +563,94 @@ class RemoteDispatcher:
         _, device, caller_id, ftype = penalty_device_caller_ftype[0]
         target_info = self.remotejit.targets[device]
         caller = self.callers[caller_id]
+        if key is not None:
+            self._dispatch_table[key] = device, caller, ftype
         r = self.remotejit.remote_call_capsule_cls(caller, target_info, ftype, arguments)
 
         return r if hold else r.execute()
 
+    async def acall(self, *arguments, device=UNSPECIFIED):
+        """Coroutine version of `__call__`.
+
+        The overload resolution runs in the event loop thread while
+        the remote compile and call requests are awaited. Concurrent
+        calls are served by a pool of connections, see
+        `thrift.AsyncClient`.
+        """
+        r = self(*arguments, device=device, hold=True)
+        if isinstance(r, RemoteCallCapsule):
+            return await r.aexecute()
+        return r
+
+    def map(self, arguments, device=UNSPECIFIED, chunksize=UNSPECIFIED):
+        """Perform remote calls on an iterable of argument tuples and
+        return a NumPy array of the results.
+
+        The function overload is resolved from the first argument
+        tuple and the other tuples are converted to its argument
+        types. The argument tuples are sent to the remote host in
+        chunks of `chunksize` tuples, one remote call per chunk, see
+        `RemoteJIT.remote_call_many`. For functions with a single
+        argument, the items of `arguments` may be scalars.
+
+        When `arguments` is empty, return an empty array with the dtype
+        of the return types of function overloads, or float64 when the
+        overloads have different or non-scalar return types.
+        """
+        if chunksize is UNSPECIFIED:
+            chunksize = self.remotejit.default_map_chunksize
+        arguments = iter(arguments)
+        capsule = None
+        results = []
+        while True:
+            chunk = [(a if isinstance(a, tuple) else (a,))
+                     for a in itertools.islice(arguments, chunksize)]
+            if not chunk:
+                break
+            if capsule is None:
+                capsule = self(*chunk[0], device=device, hold=True)
+            results.append(capsule.execute_many(chunk))
+        if not results:
+            return np.empty(0, dtype=self._return_dtype(device))
+        return np.concatenate(results)
+
+    def _return_dtype(self, device):
+        dtypes = set()
+        for device_, target_info in self.remotejit.targets.items():
+            if device is not UNSPECIFIED and device != device_:
+                continue
+            with target_info:
+                for caller in self.callers:
+                    with Type.alias(**self.remotejit.typesystem_aliases):
+                        for t in caller.signature.normalized(caller.func).signatures:
+                            rtype = self.remotejit.caller_signature(t)[0]
+                            if not _is_map_scalar(rtype):
+                                return np.dtype(np.float64)
+                            dtypes.add(np.dtype(rtype.toctypes()))
+        return dtypes.pop() if len(dtypes) == 1 else np.dtype(np.float64)
+
+
+def _function_name(func, options):
+    """Return the name of a remote function compiled with given compile
+    options. The options specific suffix avoids name collisions of
+    the same function compiled with different options.
+    """
+    if not options:
+        return func.__name__
+    return f'{func.__name__}_{hashkey(irtools.get_options_key(options))[:8]}'
+
+
+def _renamed(func, name):
+    """Return a copy of a Python function with the given name.
+    """
+    if func.__name__ == name:
+        return func
+    f = type(func)(func.__code__, func.__globals__, name,
+                   func.__defaults__, func.__closure__)
+    f.__kwdefaults__ = func.__kwdefaults__
+    f.__annotations__ = func.__annotations__
+    return f
+
 
 class RemoteCallCapsule:
     """Encapsulates remote call execution.
@@ -474,6 +679,13 @@ class RemoteCallCapsule:
     def __str__(self):
         return f'{self.execute(hold=True)}'
 
+    @property
+    def options(self):
+        """The compile options of the remote function.
+        """
+        with self.target_info, Type.alias(**self.caller.remotejit.typesystem_aliases):
+            return self.caller.get_compile_options(self.ftype)
+
     def execute(self, hold=False):
         """Trigger the remote call execution.
 
@@ -483,18 +695,79 @@ class RemoteCallCapsule:
         if not hold:
             if self.use_execute_cache and self._execute_cache is not UNSPECIFIED:
                 return self._execute_cache
-
-            key = self.caller.func.__name__, self.ftype
-            if key not in self.caller._is_compiled:
-                self.caller.remotejit.remote_compile(
-                    self.caller.func, self.ftype, self.target_info)
-                self.caller._is_compiled.add(key)
+            self._compile()
         result = self.caller.remotejit.remote_call(self.caller.func, self.ftype,
-                                                   self.arguments, hold=hold)
+                                                   self.arguments, hold=hold,
+                                                   options=self.options)
         if not hold and self.use_execute_cache:
             self._execute_cache = result
         return result
 
+    def _compile(self):
+        options = self.options
+        key = _function_name(self.caller.func, options), self.ftype
+        if key not in self.caller._is_compiled:
+            self.caller.remotejit.remote_compile(
+                self.caller.func, self.ftype, self.target_info, options=options)
+            self.caller._is_compiled.add(key)
+
+    async def _acompile(self):
+        options = self.options
+        key = _function_name(self.caller.func, options), self.ftype
+        if key in self.caller._is_compiled:
+            return
+        # concurrent calls share the remote compile request
+        task = self.caller._compile_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.caller.remotejit.aremote_compile(
+                self.caller.func, self.ftype, self.target_info, options=options))
+            self.caller._compile_tasks[key] = task
+        try:
+            await task
+        finally:
+            self.caller._compile_tasks.pop(key, None)
+        self.caller._is_compiled.add(key)
+
+    async def aexecute(self):
+        """Coroutine version of `execute`.
+        """
+        if self.use_execute_cache and self._execute_cache is not UNSPECIFIED:
+            return self._execute_cache
+        await self._acompile()
+        result = await self.caller.remotejit.aremote_call(
+            self.caller.func, self.ftype, self.arguments, options=self.options)
+        if self.use_execute_cache:
+            self._execute_cache = result
+        return result
+
+    def execute_many(self, arguments):
+        """Trigger the remote call execution on a sequence of argument
+        tuples and return a NumPy array of the results.
+        """
+        self._compile()
+        columns = []
+        for typ, column in zip(self.ftype[1], zip(*arguments)):
+            if _is_map_scalar(typ):
+                column = np.array(column, dtype=np.dtype(typ.toctypes()))
+            columns.append(column)
+        return self.caller.remotejit.remote_call_many(
+            self.caller.func, self.ftype, tuple(columns), options=self.options)
+
+    def execute_vectorized(self, arrays):
+        """Trigger the element-wise remote call execution on a sequence
+        of arrays with equal shapes and return a NumPy array of the
+        results.
+        """
+        types = (self.ftype[0],) + tuple(self.ftype[1])
+        if not all(map(_is_map_scalar, types)):
+            raise TypeError(f'cannot vectorize function with non-scalar argument or'
+                            f' return types: {self.ftype}')
+        self._compile()
+        arrays = [np.ascontiguousarray(a, dtype=np.dtype(typ.toctypes()))
+                  for typ, a in zip(self.ftype[1], arrays)]
+        return self.caller.remotejit.remote_call_vectorized(
+            self.caller.func, self.ftype, arrays, options=self.options)
+
 
 class RemoteJIT:
     """RemoteJIT is a decorator generator for user functions to be
@@ -537,8 +810,17 @@ class RemoteJIT:
     # Should calling RemoteDispatcher hold the execution:
     default_remote_call_hold = False
 
+    # Number of argument tuples sent in one remote call by
+    # RemoteDispatcher.map:
+    default_map_chunksize = 65536
+
+    # Minimal total size of arrays in bytes that are sent via shared
+    # memory, see `remote_call_vectorized`:
+    shared_memory_threshold = 1 << 16
+
     def __init__(self, host='localhost', port=11532,
-                 local=False, debug=False):
+                 local=False, debug=False, protocol='binary', transport='buffered',
+                 shared_memory=None):
         """Construct remote JIT function decorator.
 
         The decorator is re-usable for different functions.
@@ -553,6 +835,15 @@ class RemoteJIT:
           When True, use local client. Useful for debugging.
         debug : bool
           When True, output debug messages.
+        protocol : {'binary', 'compact'}
+          Specify the thrift protocol of the JIT server.
+        transport : {'buffered', 'framed'}
+          Specify the thrift transport of the JIT server.
+        shared_memory : {bool, None}
+          When True, send the arrays of vectorized calls via shared
+          memory, the JIT server must run on the same host. When None,
+          use shared memory when the JIT server is started with
+          ``start_server(background=True)``.
         """
         if host == 'localhost':
             host = get_local_ip()
@@ -563,7 +854,11 @@ class RemoteJIT:
             self.debug = debug
         self.host = host
         self.port = int(port)
+        self.protocol = protocol
+        self.transport = transport
+        self.shared_memory = shared_memory
         self.server_process = None
+        self._shared_memory_pool = None
 
         # A collection of Caller instances. Each represents a function
         # that have many argument type dependent implementations.
@@ -571,10 +866,14 @@ class RemoteJIT:
         self._last_compile = None
         self._targets = None
 
+        # Timings of compile phases, see `CompileStats`
+        self.compile_stats = CompileStats()
+
         if local:
             self._client = LocalClient(debug=debug)
         else:
             self._client = None
+        self._aclient = None
 
     def __repr__(self):
         return f'{type(self).__name__}(host={self.host!r}, port={self.port})'
@@ -589,7 +888,7 @@ class RemoteJIT:
         name = caller.func.__name__
         for c in self._callers:
             if c.name == name:
-                c.callers.append(caller)
+                c.add_caller(caller)
                 break
         else:
             self._callers.append(RemoteDispatcher(name, [caller]))
@@ -697,6 +996,17 @@ class RemoteJIT:
             targets[device] = TargetInfo.fromjson(data)
         return targets
 
+    def retrieve_jit_stats(self):
+        """Retrieve JIT compiler statistics from remote server.
+
+        Returns
+        -------
+        stats : dict
+          See `DispatcherRJIT.jit_stats` for the content.
+        """
+        response = self.client(remotejit=dict(jit_stats=()))
+        return json.loads(response['remotejit']['jit_stats'])
+
     @property
     def targets(self):
         """Return device-target_info mapping of the remote server.
@@ -705,7 +1015,9 @@ class RemoteJIT:
             self._targets = self.retrieve_targets()
         return self._targets
 
-    def __call__(self, *signatures, devices=None, local=False, **templates):
+    def __call__(self, *signatures, devices=None, local=False, opt_level=None,
+                 fastmath=None, loop_vectorize=None, slp_vectorize=None,
+                 unroll_loops=None, **templates):
         """Define a remote JIT function signatures and template.
 
         Parameters
@@ -723,6 +1035,16 @@ class RemoteJIT:
           values are 'cpu', 'gpu'.
         templates : dict(str, list(str))
           Specify template types mapping.
+        opt_level : {0, 1, 2, 3}
+          Specify LLVM optimization level of the functions. By default,
+          numba configuration is used.
+        fastmath : {bool, set}
+          Enable fast-math flags of floating point operations. A set
+          specifies the LLVM fast-math flags, for instance,
+          ``{'nnan', 'reassoc'}``.
+        loop_vectorize, slp_vectorize, unroll_loops : bool
+          Enable or disable loop vectorization, SLP vectorization, and
+          loop unrolling of the functions.
 
         Returns
         -------
@@ -752,31 +1074,47 @@ class RemoteJIT:
                              f"values 'cpu', 'gpu' but got {devices}")
 
         _, templates = extract_templates(options)
+        compile_options = irtools.check_compile_options(dict(
+            opt_level=opt_level, fastmath=fastmath, loop_vectorize=loop_vectorize,
+            slp_vectorize=slp_vectorize, unroll_loops=unroll_loops))
         for sig in signatures:
-            s = s(sig, devices=devices, templates=templates)
+            s = s(sig, devices=devices, templates=templates, **compile_options)
         return s
 
-    def start_server(self, background=False):
+    def start_server(self, background=False, backend=None):
         """Start remotejit server from client.
+
+        Parameters
+        ----------
+        background : bool
+          When True, run the server in a background process.
+        backend : {'mcjit', 'lazy', None}
+          Specify JIT backend of the server, see `jit_backends`. When
+          not specified, use RBC_JIT_BACKEND environment variable,
+          defaults to 'mcjit'.
         """
+        if backend is None:
+            backend = os.environ.get('RBC_JIT_BACKEND', 'mcjit')
+        if backend not in jit_backends:
+            raise ValueError(f'unknown JIT backend {backend!r},'
+                             f' expected one of {", ".join(jit_backends)}')
         thrift_file = os.path.join(os.path.dirname(__file__),
                                    'remotejit.thrift')
         print('staring rpc.thrift server: %s' % (thrift_file), end='',
               flush=True)
         if self.debug:
             print(flush=True)
+        if self.debug and backend == 'mcjit':
             dispatcher = DebugDispatcherRJIT
         else:
-            dispatcher = DispatcherRJIT
+            dispatcher = jit_backends[backend]
+        options = dict(host=self.host, port=self.port, debug=self.debug,
+                       protocol=self.protocol, transport=self.transport)
         if background:
-            ps = Server.run_bg(dispatcher, thrift_file,
-                               dict(host=self.host, port=self.port,
-                                    debug=self.debug))
+            ps = Server.run_bg(dispatcher, thrift_file, options)
             self.server_process = ps
         else:
-            Server.run(dispatcher, thrift_file,
-                       dict(host=self.host, port=self.port,
-                            debug=self.debug))
+            Server.run(dispatcher, thrift_file, options)
             print('... rpc.thrift server stopped', flush=True)
 
     def stop_server(self):
@@ -786,6 +1124,8 @@ class RemoteJIT:
             print('... stopping rpc.thrift server')
             self.server_process.terminate()
             self.server_process = None
+        if self._shared_memory_pool is not None:
+            self._shared_memory_pool.close()
 
     @property
     def client(self):
@@ -797,38 +1137,92 @@ class RemoteJIT:
                 port=self.port,
                 multiplexed=self.multiplexed,
                 thrift_content=self.thrift_content,
+                protocol=self.protocol,
+                transport=self.transport,
                 socket_timeout=60000)
         return self._client
 
-    def remote_compile(self, func, ftype: Type, target_info: TargetInfo):
+    @property
+    def aclient(self):
+        """Return remote host connection as AsyncClient instance.
+        """
+        if self._aclient is None:
+            if isinstance(self._client, LocalClient):
+                self._aclient = AsyncLocalClient(self._client)
+            else:
+                self._aclient = AsyncClient(
+                    host=self.host,
+                    port=self.port,
+                    multiplexed=self.multiplexed,
+                    thrift_content=self.thrift_content,
+                    protocol=self.protocol,
+                    transport=self.transport,
+                    socket_timeout=60000)
+        return self._aclient
+
+    def remote_compile(self, func, ftype: Type, target_info: TargetInfo, options=None):
         """Remote compile function and signatures to machine code.
 
         The input function `func` is compiled to LLVM IR module, the
         LLVM IR module is sent to remote host where the remote host is
-        expected to complete the compilation process.
+        expected to complete the compilation process. The function is
+        compiled with given compile options, see `Signature.__call__`.
 
         Return the corresponding LLVM IR module instance which may be
         useful for debugging.
         """
+        if self.debug:
+            print(f'remote_compile({func}, {ftype})')
+        llvm_module, method, args, info = self._get_compile_request(
+            func, ftype, target_info, options, self.client)
+        with self.compile_stats.record('remote_compile', **info):
+            response = self.client(remotejit={method: args})
+        assert response['remotejit'][method], response
+        return llvm_module
+
+    async def aremote_compile(self, func, ftype: Type, target_info: TargetInfo,
+                              options=None):
+        """Coroutine version of `remote_compile`.
+
+        The function is compiled to LLVM IR module in the event loop
+        thread, only the remote compile request is awaited.
+        """
+        if self.debug:
+            print(f'aremote_compile({func}, {ftype})')
+        llvm_module, method, args, info = self._get_compile_request(
+            func, ftype, target_info, options, self.aclient)
+        with self.compile_stats.record('remote_compile', **info):
+            response = await self.aclient(remotejit={method: args})
+        assert response['remotejit'][method], response
+        return llvm_module
+
+    def _get_compile_request(self, func, ftype, target_info, options, client):
         # To-Do: Move the pipeline to outside heavydb_backend
         from rbc.heavydb import HeavyDBCompilerPipeline
 
-        if self.debug:
-            print(f'remote_compile({func}, {ftype})')
+        options = options or {}
+        name = _function_name(func, options)
         with target_info:
             llvm_module, succesful_fids = irtools.compile_to_LLVM(
-                [(func, {0: ftype})],
+                [(_renamed(func, name), {0: ftype}, {0: options})],
                 target_info,
                 pipeline_class=HeavyDBCompilerPipeline,
-                debug=self.debug)
-        ir = str(llvm_module)
+                debug=self.debug,
+                stats=self.compile_stats)
+        info = dict(function=func.__name__, signature=str(ftype), device=target_info.name)
+        # Send LLVM bitcode when server supports it, otherwise LLVM IR
+        if client.supports('remotejit', 'compile_bitcode'):
+            method = 'compile_bitcode'
+            with self.compile_stats.record('serialize', **info):
+                ir = llvm_module.as_bitcode()
+        else:
+            method = 'compile'
+            with self.compile_stats.record('serialize', **info):
+                ir = str(llvm_module)
         mangled_signatures = ';'.join([s.mangle() for s in [ftype]])
-        response = self.client(remotejit=dict(
-            compile=(func.__name__, mangled_signatures, ir)))
-        assert response['remotejit']['compile'], response
-        return llvm_module
+        return llvm_module, method, (name, mangled_signatures, ir), info
 
-    def remote_call(self, func, ftype: Type, arguments: tuple, hold=False):
+    def remote_call(self, func, ftype: Type, arguments: tuple, hold=False, options=None):
         """Call function remotely on given arguments.
 
         The input function `func` is called remotely by sending the
@@ -839,16 +1233,97 @@ class RemoteJIT:
         If `hold` is True then return an object that specifies remote
         call but does not execute it. The type of return object is
         custom to particular RemoteJIT specialization.
+
+        The `options` must be the compile options used in
+        `remote_compile`.
         """
         if self.debug:
             print(f'remote_call({func}, {ftype}, {arguments})')
-        fullname = func.__name__ + ftype.mangle()
+        fullname = _function_name(func, options) + ftype.mangle()
         call = dict(call=(fullname, arguments))
         if hold:
             return call
         response = self.client(remotejit=call)
         return response['remotejit']['call']
 
+    async def aremote_call(self, func, ftype: Type, arguments: tuple, options=None):
+        """Coroutine version of `remote_call`.
+        """
+        if self.debug:
+            print(f'aremote_call({func}, {ftype}, {arguments})')
+        fullname = _function_name(func, options) + ftype.mangle()
+        response = await self.aclient(remotejit=dict(call=(fullname, arguments)))
+        return response['remotejit']['call']
+
+    def remote_call_many(self, func, ftype: Type, arguments: tuple, options=None):
+        """Call function remotely on many argument tuples.
+
+        The `arguments` contains the columns of argument values, one
+        per function argument, see `DispatcherRJIT.call_many`. Returns
+        a NumPy array of the results.
+        """
+        if self.debug:
+            print(f'remote_call_many({func}, {ftype}, <{len(arguments)} columns>)')
+        fullname = _function_name(func, options) + ftype.mangle()
+        response = self.client(remotejit=dict(call_many=(fullname, arguments)))
+        return response['remotejit']['call_many']
+
+    def remote_call_vectorized(self, func, ftype: Type, arguments: list, options=None):
+        """Call function remotely element-wise on arrays.
+
+        The `arguments` contains C-contiguous arrays with equal shapes
+        and the dtypes of function arguments. The arrays are sent to
+        the remote host as NDArray buffers, see
+        `DispatcherRJIT.call_vectorized`, or via shared memory when the
+        server runs on the same host, see `shared_memory`. Returns a
+        NumPy array of the results.
+        """
+        if self.debug:
+            print(f'remote_call_vectorized({func}, {ftype}, <{len(arguments)} arrays>)')
+        fullname = _function_name(func, options) + ftype.mangle()
+        if self._use_shared_memory(sum(a.nbytes for a in arguments)):
+            return self._remote_call_vectorized_shared(fullname, ftype, arguments)
+        response = self.client(remotejit=dict(call_vectorized=(fullname, arguments)))
+        return response['remotejit']['call_vectorized']
+
+    @property
+    def shared_memory_pool(self):
+        """Return the pool of shared memory segments, see
+        `rbc.shared_memory.SharedMemoryPool`.
+        """
+        if self._shared_memory_pool is None:
+            self._shared_memory_pool = shared_memory.SharedMemoryPool()
+        return self._shared_memory_pool
+
+    def _use_shared_memory(self, nbytes):
+        if isinstance(self.client, LocalClient):
+            return False
+        enabled = self.shared_memory
+        if enabled is None:
+            enabled = self.server_process is not None
+        return enabled and nbytes >= self.shared_memory_threshold
+
+    def _remote_call_vectorized_shared(self, fullname, ftype, arguments):
+        # Only the names of shared memory segments are sent to the
+        # server, see `DispatcherRJIT.call_vectorized_shared`
+        thrift = self.client.thrift
+        pool = self.shared_memory_pool
+        shape = arguments[0].shape
+        dtype = np.dtype(ftype[0].toctypes())
+        dtypes = [a.dtype for a in arguments] + [dtype]
+        segments = [pool.acquire(int(np.prod(shape)) * t.itemsize) for t in dtypes]
+        try:
+            shared = [thrift.SharedArray(name=shm.name, shape=list(shape), typestr=t.str)
+                      for shm, t in zip(segments, dtypes)]
+            for shm, a in zip(segments, arguments):
+                shared_memory.ndarray(shm, shape, a.dtype)[...] = a
+            self.client(remotejit=dict(call_vectorized_shared=(
+                fullname, shared[:-1], shared[-1])))
+            return shared_memory.ndarray(segments[-1], shape, dtype).copy()
+        finally:
+            for shm in segments:
+                pool.release(shm)
+
     def python(self, statement):
         """Execute Python statement remotely.
         """
@@ -905,6 +1380,24 @@ class RemoteJIT:
         """
         return tuple(map(Type.fromvalue, values))
 
+    def get_dispatch_key(self, *values):
+        """Return a hashable key of values that determines their
+        typesystem types, see `get_types`, or None when the types
+        depend on the values themselves.
+
+        Remote calls with equal keys are dispatched to the same
+        function overload without repeating the overload resolution.
+        """
+        key = tuple(map(type, values))
+        for cls in key:
+            if cls in _python_imap or cls in _numpy_imap:
+                continue
+            if (issubclass(cls, (_ctypes._Pointer, ctypes.c_void_p))
+                    and not hasattr(cls, '__typesystem_type__')):
+                continue
+            return
+        return key
+
     def format_type(self, typ: Type):
         """Convert typesystem type to formatted string.
         """
@@ -926,16 +1419,44 @@ class RemoteJIT:
         return lines
 
 
+def _is_map_scalar(typ):
+    return (typ.is_int or typ.is_uint or typ.is_float or typ.is_bool) and typ.bits in (
+        1, 8, 16, 32, 64)
+
+
 class DispatcherRJIT(Dispatcher):
     """Implements remotejit service methods.
+
+    The functions are compiled to machine code eagerly when a module
+    is received, see `LazyDispatcherRJIT` for an alternative.
     """
 
+    backend = 'mcjit'
+    # When True, materialize functions on the first call
+    lazy = False
+
     def __init__(self, server, debug=False):
         super().__init__(server, debug=debug)
         self.compiled_functions = dict()
+        # One execution engine per target triple
         self.engines = dict()
+        # Maps symbol names to the records of compiled modules,
+        # a record is a dictionary with keys engine, module, ir,
+        # functions, symbols, and engine_modules
+        self.module_symbols = dict()
+        # Maps function full names to (record, native loop) pairs,
+        # see `call_many`
+        self.map_functions = dict()
         self.python_globals = dict()
         self.python_locals = dict()
+        # Timings of parse and materialize phases, see `jit_stats`
+        self.compile_stats = CompileStats()
+        # Object code of compiled modules keyed by the hash of LLVM IR,
+        # target triple, and host CPU features. Spills to the
+        # persistent compile cache when RBC_CACHE_DIR is set.
+        self.object_cache = MemoryCache(backend=irtools.get_compile_cache())
+        self._object_keys = dict()
+        self._lock = threading.RLock()
 
     @dispatchermethod
     def targets(self) -> dict:
@@ -964,26 +1485,140 @@ class DispatcherRJIT(Dispatcher):
         ir : str
           Specify LLVM IR representation of the function.
         """
-        engine = irtools.compile_IR(ir)
+        return self._compile(name, signatures, ir)
+
+    @dispatchermethod
+    def compile_bitcode(self, name: str, signatures: str, bitcode: bytes) -> int:
+        """JIT compile function from LLVM bitcode.
+
+        Parameters
+        ----------
+        name : str
+          Specify the function name.
+        signatures : str
+          Specify semi-colon separated list of mangled signatures.
+        bitcode : bytes
+          Specify LLVM bitcode of the function.
+        """
+        return self._compile(name, signatures, bitcode)
+
+    def _compile(self, name, signatures, ir):
+        with self._lock:
+            return self._compile_unlocked(name, signatures, ir)
+
+    def _compile_unlocked(self, name, signatures, ir):
+        sigs = []
         for msig in signatures.split(';'):
             sig = Type.demangle(msig)
-            ctypes_sig = sig.toctypes()
             assert sig.is_function
             if sig[0].is_aggregate:
                 raise RuntimeError(
                     f'Functions with aggregate return type values are not supported,'
                     f' got function `{name}` with `{sig}` signature')
+            sigs.append((msig, sig))
+
+        with self.compile_stats.record('jit.parse', function=name):
+            module = irtools.parse_IR(ir)
+        engine = self.engines.get(module.triple)
+        if engine is None:
+            engine = self.engines[module.triple] = irtools.create_execution_engine(
+                module.triple)
+            engine.set_object_cache(self._notify_object, self._get_object)
+
+        # Remove the modules that define the same symbols from the engine
+        symbols = irtools.get_defined_symbols(module)
+        for symbol in symbols:
+            record = self.module_symbols.get(symbol)
+            if record is not None:
+                self.release_module(record)
+
+        record = dict(engine=engine, module=module, ir=ir, functions=[], symbols=symbols,
+                      engine_modules=[])
+        for symbol in symbols:
+            self.module_symbols[symbol] = record
+
+        for msig, sig in sigs:
             fullname = name + msig
-            addr = engine.get_function_address(fullname)
-            if self.debug:
-                print(f'compile({name}, {sig}) -> {hex(addr)}')
-            # storing engine as the owner of function addresses
-            if addr:
-                self.compiled_functions[fullname] = engine, ctypes_sig(addr), sig, ctypes_sig
-            else:
-                warnings.warn('No compilation result for {name}|{sig=}')
+            # storing module record as the owner of function addresses,
+            # the address is resolved when the function is materialized
+            self.compiled_functions[fullname] = record, None, sig, sig.toctypes()
+            record['functions'].append(fullname)
+        if not self.lazy:
+            self.materialize(record)
         return True
 
+    def materialize(self, record, fullname=None):
+        """Compile the module of a record to machine code and resolve
+        the addresses of its functions.
+
+        The `fullname` argument is used by lazy backends to
+        materialize only the named function.
+        """
+        engine = record['engine']
+        module = record['module']
+        with self.compile_stats.record('jit.materialize', function=fullname):
+            self._add_module(engine, module, irtools.get_object_key(record['ir'], module.triple))
+        record['engine_modules'].append(module)
+        for name in record['functions']:
+            self._resolve(record, engine, name)
+
+    def _add_module(self, engine, module, key):
+        self._object_keys[id(module)] = key
+        try:
+            irtools.add_module(engine, module)
+        finally:
+            del self._object_keys[id(module)]
+
+    def _notify_object(self, module, buf):
+        key = self._object_keys.get(id(module))
+        if key is not None:
+            self.object_cache.set(key, (buf,))
+
+    def _get_object(self, module):
+        key = self._object_keys.get(id(module))
+        if key is not None:
+            value = self.object_cache.get(key)
+            if value is not None:
+                return value[0]
+
+    def _resolve(self, record, engine, fullname):
+        ef = self.compiled_functions.get(fullname)
+        if ef is None or ef[0] is not record or ef[1] is not None:
+            return
+        sig, ctypes_sig = ef[2], ef[3]
+        addr = engine.get_function_address(fullname)
+        if self.debug:
+            print(f'materialize({fullname}, {sig}) -> {hex(addr)}')
+        if addr:
+            self.compiled_functions[fullname] = record, ctypes_sig(addr), sig, ctypes_sig
+        else:
+            del self.compiled_functions[fullname]
+            warnings.warn(f'No compilation result for {fullname}|{sig=}')
+
+    def release_module(self, record):
+        """Remove compiled module from its execution engine and forget
+        the functions defined in the module.
+        """
+        for fullname in record['functions']:
+            if self.compiled_functions.get(fullname, (None,))[0] is record:
+                del self.compiled_functions[fullname]
+            if self.map_functions.get(fullname, (None,))[0] is record:
+                del self.map_functions[fullname]
+        for symbol in record['symbols']:
+            if self.module_symbols.get(symbol) is record:
+                del self.module_symbols[symbol]
+        for module in record['engine_modules']:
+            record['engine'].remove_module(module)
+        record['engine_modules'].clear()
+
+    def release(self, fullname):
+        """Free the compiled function and other functions of the same
+        module.
+        """
+        ef = self.compiled_functions.get(fullname)
+        if ef is not None:
+            self.release_module(ef[0])
+
     @dispatchermethod
     def call(self, fullname: str, arguments: tuple) -> Data:
         """Call JIT compiled function
@@ -998,11 +1633,166 @@ class DispatcherRJIT(Dispatcher):
         """
         if self.debug:
             print(f'call({fullname}, {arguments})')
+        return self._call(self._get_function(fullname), arguments)
+
+    @dispatchermethod
+    def call_many(self, fullname: str, arguments: tuple) -> Data:
+        """Call JIT compiled function on many argument tuples.
+
+        Parameters
+        ----------
+        fullname : str
+          Specify the full name of the function that is in form
+          "<name><mangled signature>"
+        arguments : tuple
+          Specify the columns of arguments. A column is a NumPy array
+          when the argument type is scalar, otherwise a tuple.
+
+        Returns
+        -------
+        result : numpy.ndarray
+          The results of function calls.
+        """
+        if self.debug:
+            print(f'call_many({fullname}, <{len(arguments)} columns>)')
+        ef = self._get_function(fullname)
+        map_function = self._get_map_function(fullname, ef)
+        if map_function is not None:
+            return self._call_map_function(map_function, ef[2], arguments)
+        # functions with non-scalar arguments are called one by one
+        return np.array([self._call(ef, args) for args in zip(*arguments)])
+
+    @dispatchermethod
+    def call_vectorized(self, fullname: str, arguments: list) -> NDArray:
+        """Call JIT compiled scalar function element-wise on arrays.
+
+        Parameters
+        ----------
+        fullname : str
+          Specify the full name of the function that is in form
+          "<name><mangled signature>"
+        arguments : list
+          Specify the arrays of arguments. The arrays must have equal
+          shapes.
+
+        Returns
+        -------
+        result : numpy.ndarray
+          The results of function calls with the shape of arguments.
+        """
+        if self.debug:
+            print(f'call_vectorized({fullname}, <{len(arguments)} arrays>)')
+        ef = self._get_function(fullname)
+        map_function = self._get_map_function(fullname, ef)
+        if map_function is None:
+            raise TypeError(f'cannot vectorize function `{fullname}` with non-scalar'
+                            f' argument or return types')
+        arrays = [a if isinstance(a, np.ndarray) else NDArray.toobject(self.thrift, a)
+                  for a in arguments]
+        shape = arrays[0].shape if arrays else ()
+        if any(a.shape != shape for a in arrays):
+            raise ValueError('argument arrays must have equal shapes')
+        result = self._call_map_function(map_function, ef[2], [a.ravel() for a in arrays])
+        return result.reshape(shape)
+
+    @dispatchermethod
+    def call_vectorized_shared(self, fullname: str, arguments: list, result) -> bool:
+        """Call JIT compiled scalar function element-wise on arrays in
+        shared memory.
+
+        Parameters
+        ----------
+        fullname : str
+          Specify the full name of the function that is in form
+          "<name><mangled signature>"
+        arguments : list
+          Specify the shared memory segments of argument arrays, see
+          `rbc.shared_memory`. The arrays must have equal shapes and
+          the dtypes of function arguments.
+        result : SharedArray
+          Specify the shared memory segment of the result array.
+
+        Returns
+        -------
+        success : bool
+          True when the results are written to the result array.
+        """
+        if self.debug:
+            print(f'call_vectorized_shared({fullname}, <{len(arguments)} arrays>)')
+        ef = self._get_function(fullname)
+        map_function = self._get_map_function(fullname, ef)
+        if map_function is None:
+            raise TypeError(f'cannot vectorize function `{fullname}` with non-scalar'
+                            f' argument or return types')
+        arrays = [shared_memory.ndarray(shared_memory.attach(a.name), tuple(a.shape), a.typestr)
+                  for a in arguments + [result]]
+        if any(a.shape != arrays[-1].shape for a in arrays):
+            raise ValueError('argument arrays must have equal shapes')
+        # the compiled function reads and writes the shared memory directly
+        self._call_map_function(map_function, ef[2], [a.ravel() for a in arrays[:-1]],
+                                result=arrays[-1].ravel())
+        return True
+
+    def _call_map_function(self, map_function, sig, columns, result=None):
+        n = len(columns[0]) if columns else 0
+        columns = [np.ascontiguousarray(a, dtype=np.dtype(t.toctypes()))
+                   for t, a in zip(sig[1], columns)]
+        if any(len(a) != n for a in columns):
+            raise ValueError('argument columns must have equal lengths')
+        if result is None:
+            result = np.empty(n, dtype=np.dtype(sig[0].toctypes()))
+        elif result.dtype != np.dtype(sig[0].toctypes()) or len(result) != n:
+            raise ValueError('result array must have the length of argument columns'
+                             ' and the dtype of function return value')
+        pointers = (ctypes.c_void_p * max(len(columns), 1))(*[a.ctypes.data for a in columns])
+        map_function(n, pointers, result.ctypes.data)
+        return result
+
+    def _get_function(self, fullname):
         ef = self.compiled_functions.get(fullname)
+        if ef is not None and ef[1] is None:
+            with self._lock:
+                ef = self.compiled_functions.get(fullname)
+                if ef is not None and ef[1] is None:
+                    self.materialize(ef[0], fullname)
+                    ef = self.compiled_functions.get(fullname)
         if ef is None:
             raise RuntimeError(
                 f'no such compiled function `{fullname}`. Available functions:\n'
                 f'  {"; ".join(list(self.compiled_functions))}\n.')
+        return ef
+
+    def _get_map_function(self, fullname, ef):
+        """Return the native loop over the compiled function, see
+        `irtools.make_map_function`, or None when the function
+        arguments or return value are not scalars.
+        """
+        entry = self.map_functions.get(fullname)
+        if entry is not None and entry[0] is ef[0]:
+            return entry[1]
+        with self._lock:
+            # another thread may have created the map function meanwhile
+            entry = self.map_functions.get(fullname)
+            if entry is not None and entry[0] is ef[0]:
+                return entry[1]
+            record = ef[0]
+            sig = ef[2]
+            map_function = ir = None
+            if all(map(_is_map_scalar, (sig[0],) + tuple(sig[1]))):
+                ir = irtools.make_map_function(record['module'], fullname)
+            if ir is not None:
+                engine = record['engine']
+                module = irtools.parse_IR(ir)
+                self._add_module(engine, module, irtools.get_object_key(ir, module.triple))
+                record['engine_modules'].append(module)
+                addr = engine.get_function_address(fullname + '.map')
+                map_function = ctypes.CFUNCTYPE(
+                    None, ctypes.c_int64, ctypes.POINTER(ctypes.c_void_p),
+                    ctypes.c_void_p)(addr)
+            self.map_functions[fullname] = record, map_function
+            return map_function
+
+    def _call(self, ef, arguments):
         sig = ef[2]
         ctypes_sig = ef[3]
         if len(arguments) == 0:
@@ -1036,6 +1826,35 @@ class DispatcherRJIT(Dispatcher):
             return r.topython()
         return r
 
+    @dispatchermethod
+    def jit_stats(self) -> str:
+        """Return JSON string of JIT compiler statistics.
+
+        The statistics contain the backend name, the summary of
+        `jit.parse` and `jit.materialize` phase timings, the numbers of
+        compiled and materialized functions, the size of the LLVM IR
+        held by the server in bytes, the peak resident set size of
+        the server process in kilobytes (None when not available), and
+        the statistics of the object code cache including its hit
+        rate.
+        """
+        with self._lock:
+            records = {id(ef[0]): ef[0] for ef in self.compiled_functions.values()}
+            materialized = sum(ef[1] is not None for ef in self.compiled_functions.values())
+            ir_bytes = sum(len(r['ir']) for r in records.values())
+            functions = len(self.compiled_functions)
+        maxrss = None
+        if resource is not None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        object_cache = self.object_cache.stats()
+        lookups = object_cache['hits'] + object_cache['misses']
+        object_cache['hit_rate'] = object_cache['hits'] / lookups if lookups else None
+        if self.object_cache.backend is not None:
+            object_cache['backend'] = self.object_cache.backend.stats()
+        return json.dumps(dict(backend=self.backend, summary=self.compile_stats.summary(),
+                               functions=functions, materialized=materialized,
+                               ir_bytes=ir_bytes, maxrss=maxrss, object_cache=object_cache))
+
     @dispatchermethod
     def python(self, statement: str) -> int:
         """Execute Python statement.
@@ -1054,14 +1873,65 @@ class DebugDispatcherRJIT(DispatcherRJIT):
     debug = True
 
 
+class LazyDispatcherRJIT(DispatcherRJIT):
+    """Implements remotejit service methods with lazy compilation.
+
+    A received module is parsed and verified but a function is
+    compiled to machine code only when it is called for the first
+    time. The materialized module contains only the called function
+    and its dependencies. Modules that define exported global
+    variables are materialized as a whole.
+    """
+
+    backend = 'lazy'
+    lazy = True
+
+    def materialize(self, record, fullname=None):
+        if fullname is None:
+            return super().materialize(record, fullname=fullname)
+        engine = record['engine']
+        with self.compile_stats.record('jit.materialize', function=fullname):
+            module = irtools.extract_function_module(record['ir'], fullname)
+            if module is not None:
+                key = irtools.get_object_key(record['ir'], module.triple, name=fullname)
+                self._add_module(engine, module, key)
+        if module is None:
+            return super().materialize(record, fullname=fullname)
+        record['engine_modules'].append(module)
+        self._resolve(record, engine, fullname)
+
+
+jit_backends = dict(mcjit=DispatcherRJIT, lazy=LazyDispatcherRJIT)
+
+
+class AsyncLocalClient:
+    """Pretender of thrift.AsyncClient that uses the dispatcher of a
+    LocalClient.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def supports(self, service_name, method_name):
+        return self.client.supports(service_name, method_name)
+
+    async def __call__(self, **services):
+        return self.client(**services)
+
+
 class LocalClient:
     """Pretender of thrift.Client.
 
     All calls will be made in a local process. Useful for debbuging.
     """
 
-    def __init__(self, debug=False):
-        self.dispatcher = DispatcherRJIT(None, debug=debug)
+    def __init__(self, debug=False, backend='mcjit'):
+        self.dispatcher = jit_backends[backend](None, debug=debug)
+
+    def supports(self, service_name, method_name):
+        """Check if dispatcher implements a service method.
+        """
+        return service_name == 'remotejit' and hasattr(self.dispatcher, method_name)
 
     def __call__(self, **services):
         results = {}
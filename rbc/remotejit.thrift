@@ -1,9 +1,20 @@
 include "thrift/info.thrift"
 include "thrift/types.thrift"
 
+struct SharedArray {
+    1: string name;  // shared memory segment name
+    2: list<i32> shape;
+    3: string typestr;
+}
+
 service remotejit {
     map<string, string> targets() throws (1: Exception e),
     bool compile(1: string name, 2: string signatures, 3: string ir) throws (1: Exception e),
+    bool compile_bitcode(1: string name, 2: string signatures, 3: Buffer bitcode) throws (1: Exception e),
     Data call(1: string fullname, 2: Data arguments) throws (1: Exception e),
+    Data call_many(1: string fullname, 2: Data arguments) throws (1: Exception e),
+    NDArray call_vectorized(1: string fullname, 2: list<NDArray> arguments) throws (1: Exception e),
+    bool call_vectorized_shared(1: string fullname, 2: list<SharedArray> arguments, 3: SharedArray result) throws (1: Exception e),
+    string jit_stats() throws (1: Exception e),
     bool python(1: string statement) throws (1: Exception e),
 }
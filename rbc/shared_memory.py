@@ -0,0 +1,153 @@
+"""Shared memory data plane of same-host clients and servers.
+
+The client copies array arguments to shared memory segments taken
+from a `SharedMemoryPool` and sends only the segment names to the
+server. The server maps the segments with `attach` and passes the
+pointers to the shared memory directly to the compiled functions. The
+results are written to a shared memory segment as well.
+
+"""
+import mmap
+import weakref
+import threading
+import multiprocessing
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+
+def _segment_size(nbytes):
+    """Return the size of a segment that holds nbytes. The sizes are
+    rounded up to powers of two for reusing segments of similar sizes.
+    """
+    size = mmap.PAGESIZE
+    while size < nbytes:
+        size *= 2
+    return size
+
+
+def _unlink_segments(segments):
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            # the memory is still in use, it will be released when unused
+            pass
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    segments.clear()
+
+
+class SharedMemoryPool:
+    """A pool of shared memory segments owned by the current process.
+
+    Usage:
+
+    .. code-block:: python
+
+        pool = SharedMemoryPool()
+        shm = pool.acquire(nbytes)
+        <use shm.buf, send shm.name to a same-host process>
+        pool.release(shm)
+
+    Released segments are reused by the following `acquire` calls. At
+    most `maxsize` idle segments are kept, the rest are unlinked. All
+    segments are unlinked when the pool is closed or garbage
+    collected.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.created = 0
+        self.reused = 0
+        self._segments = []
+        self._idle = []
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _unlink_segments, self._segments)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(maxsize={self.maxsize})'
+
+    def acquire(self, nbytes):
+        """Return a shared memory segment with at least nbytes.
+        """
+        with self._lock:
+            for i, shm in enumerate(self._idle):
+                if shm.size >= nbytes:
+                    self.reused += 1
+                    return self._idle.pop(i)
+            shm = shared_memory.SharedMemory(create=True, size=_segment_size(nbytes))
+            _created[shm.name] = shm
+            self._segments.append(shm)
+            self.created += 1
+        return shm
+
+    def release(self, shm):
+        """Return the segment to the pool.
+        """
+        with self._lock:
+            self._idle.append(shm)
+            self._idle.sort(key=lambda s: s.size)
+            while len(self._idle) > self.maxsize:
+                # drop the largest idle segment
+                s = self._idle.pop()
+                self._segments.remove(s)
+                _unlink_segments([s])
+
+    def close(self):
+        """Unlink all segments of the pool.
+        """
+        with self._lock:
+            self._idle.clear()
+            _unlink_segments(self._segments)
+
+    @property
+    def stats(self):
+        return dict(created=self.created, reused=self.reused,
+                    size=sum(s.size for s in self._segments))
+
+
+# Segments created and attached by the current process, see `attach`
+_created = weakref.WeakValueDictionary()
+_attached = OrderedDict()
+_attached_lock = threading.Lock()
+_max_attached = 64
+
+
+def attach(name):
+    """Return the shared memory segment with the given name that is
+    created by a `SharedMemoryPool` of this or another process.
+
+    The segments are kept attached for reuse. The segment owner is
+    responsible for unlinking the segments.
+    """
+    shm = _created.get(name)
+    if shm is not None:
+        return shm
+    with _attached_lock:
+        shm = _attached.get(name)
+        if shm is not None:
+            _attached.move_to_end(name)
+            return shm
+        shm = shared_memory.SharedMemory(name=name)
+        if multiprocessing.parent_process() is None:
+            # a standalone process has its own resource tracker that
+            # would unlink the segment at exit
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        _attached[name] = shm
+        while len(_attached) > _max_attached:
+            _, s = _attached.popitem(last=False)
+            try:
+                s.close()
+            except BufferError:
+                # the memory is still in use
+                pass
+    return shm
+
+
+def ndarray(shm, shape, dtype):
+    """Return array that uses the memory of a shared memory segment.
+    """
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
@@ -0,0 +1,135 @@
+"""Instrumentation of compilation phases.
+
+A CompileStats instance records the wall and CPU times of the phases
+of `irtools.compile_to_LLVM` and `irtools.compile_instance` for each
+function and signature. The records can be summarized or exported as
+JSON.
+"""
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+# Phases of numba pipeline passes, see `CompileStats.add_numba_timings`
+_numba_pass_phases = (
+    ('type_inference', 'numba.typing'),
+    ('lowering', 'numba.lowering'),
+    ('backend', 'numba.lowering'),
+)
+
+
+class CompileStats:
+    """Records of compile phase timings.
+
+    Usage:
+
+    .. code-block:: python
+
+        stats = CompileStats()
+        with stats.record('optimize', function='foo', signature='i32(i32)'):
+            ...
+        print(stats.summary())
+        open('stats.json', 'w').write(stats.tojson())
+
+    Each record is a dictionary with keys ``phase``, ``function``,
+    ``signature``, ``device``, ``wall``, and ``cpu``, the times are in
+    seconds. The CPU time of numba pass phases is not available and is
+    None. At most `max_records` most recent records are kept.
+    """
+
+    def __init__(self, max_records=100000):
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(records={len(self.records)})'
+
+    def add(self, phase, wall, cpu=None, function=None, signature=None, device=None):
+        """Add a record.
+        """
+        with self._lock:
+            self.records.append(dict(phase=phase, function=function,
+                                     signature=signature, device=device,
+                                     wall=wall, cpu=cpu))
+
+    def extend(self, records):
+        """Add records, for instance, from another CompileStats instance.
+        """
+        with self._lock:
+            self.records.extend(records)
+
+    @contextmanager
+    def record(self, phase, function=None, signature=None, device=None):
+        """Context manager that records the wall and CPU times of its
+        body.
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - wall, time.process_time() - cpu,
+                     function=function, signature=signature, device=device)
+
+    def add_numba_timings(self, metadata, function=None, signature=None, device=None):
+        """Add the timings of numba pipeline passes from the metadata of
+        numba compile result.
+        """
+        phases = defaultdict(float)
+        for timings in metadata.get('pipeline_times', {}).values():
+            for name, t in timings.items():
+                for key, phase in _numba_pass_phases:
+                    if key in name:
+                        break
+                else:
+                    phase = 'numba.other'
+                phases[phase] += t.init + t.run + t.finalize
+        for phase, wall in phases.items():
+            self.add(phase, wall, function=function, signature=signature, device=device)
+
+    def clear(self):
+        """Remove all records.
+        """
+        with self._lock:
+            self.records.clear()
+
+    def summary(self, by='phase'):
+        """Return total times and counts of records grouped by a record
+        key.
+
+        Parameters
+        ----------
+        by : {'phase', 'function', 'signature', 'device'}
+
+        Returns
+        -------
+        summary : dict
+          A mapping of key values and dictionaries with keys
+          ``count``, ``wall``, and ``cpu``.
+        """
+        result = {}
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            s = result.get(r[by])
+            if s is None:
+                s = result[r[by]] = dict(count=0, wall=0.0, cpu=0.0)
+            s['count'] += 1
+            s['wall'] += r['wall']
+            if r['cpu'] is not None:
+                s['cpu'] += r['cpu']
+        return result
+
+    def todict(self):
+        """Return records and summary as a dictionary.
+        """
+        with self._lock:
+            records = list(self.records)
+        return dict(records=records, summary=self.summary())
+
+    def tojson(self, **kwargs):
+        """Return records and summary as a JSON string.
+        """
+        return json.dumps(self.todict(), **kwargs)
@@ -1,6 +1,7 @@
 """TargetInfo class specific
 """
 import ctypes
+import hashlib
 import json
 import warnings
 from . import libfuncs
@@ -158,6 +159,19 @@ class TargetInfo(object):
     def fromjson(cls, data):
         return cls.fromdict(json.loads(data))
 
+    @property
+    def fingerprint(self):
+        """Return a hexdigest that identifies target device information.
+
+        Target info instances with equal fingerprints will produce
+        identical compilation results.
+        """
+        data = self.todict()
+        data['libraries'] = sorted(data['libraries'])
+        data['externals'] = sorted(data['externals'])
+        content = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
     @classmethod
     def dummy(cls):
         """Returns dummy target info instance.
@@ -1,4 +1,4 @@
-__all__ = ['heavydb_fixture', 'sql_execute']
+__all__ = ['heavydb_fixture', 'sql_execute', 'benchmark']
 
 
 import os
@@ -8,6 +8,12 @@ import numpy
 from collections import defaultdict
 
 
+# Marks tests that compare wall-clock timings. These are run only when
+# RBC_BENCHMARK environment variable is set to non-zero.
+benchmark = pytest.mark.skipif(not int(os.environ.get('RBC_BENCHMARK', 0)),
+                               reason='set RBC_BENCHMARK=1 to run benchmarks')
+
+
 def assert_equal(actual, desired):
     """Test equality of actual and desired.
 
@@ -757,6 +757,29 @@ def test_unregistering(heavydb):
         heavydb.sql_execute('select fahrenheit2celsius(40)')
 
 
+def test_incremental_register(heavydb):
+    heavydb.reset()
+
+    @heavydb('i32(i32)')
+    def incr_register_a(x):
+        return x + 1
+
+    heavydb.register()
+    misses = heavydb.instance_cache.stats()['misses']
+
+    @heavydb('i32(i32)')
+    def incr_register_b(x):
+        return x + 2
+
+    hits = heavydb.instance_cache.stats()['hits']
+    _, result = heavydb.sql_execute('select incr_register_a(1), incr_register_b(1)')
+    assert list(result)[0] == (2, 3)
+    stats = heavydb.instance_cache.stats()
+    # only incr_register_b is compiled, once per device
+    assert stats['misses'] - misses == len(heavydb.targets)
+    assert stats['hits'] - hits == len(heavydb.targets)
+
+
 def test_format_type(heavydb):
     def test(s, caller=False):
         with heavydb.targets['cpu']:
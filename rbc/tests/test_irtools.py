@@ -0,0 +1,280 @@
+import pytest
+from rbc import irtools
+from rbc.cache import DiskCache, MemoryCache, function_key
+from rbc.remotejit import RemoteJIT
+from rbc.typesystem import Type
+from rbc.tests import benchmark
+
+
+@pytest.fixture(scope="module")
+def target_info():
+    ljit = RemoteJIT(local=True)
+    return ljit.targets['cpu']
+
+
+def _compile(target_info, func, *signatures, **options):
+    with target_info:
+        sigs = {}
+        for i, sig in enumerate(signatures):
+            sigs[i] = Type.fromstring(sig)
+        return irtools.compile_to_LLVM([(func, sigs)], target_info, **options)
+
+
+def _defined_functions(module):
+    return sorted(f.name for f in module.functions if not f.is_declaration)
+
+
+def test_function_key():
+
+    def foo(x):
+        return x + 1
+
+    def bar(x):
+        return x + 1
+
+    def foo2(x):
+        return x + 2
+
+    assert function_key(foo) == function_key(foo)
+    assert function_key(foo) != function_key(foo2)
+    assert function_key(foo) != function_key(bar)  # names differ
+
+    a = 1
+
+    def foo(x):
+        return x + a
+
+    k1 = function_key(foo)
+    a = 2
+    assert function_key(foo) != k1
+
+
+def test_function_key_module_attribute(tmp_path, monkeypatch):
+    import sys
+    import importlib.util
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)
+    path = tmp_path / 'helper.py'
+    path.write_text('def helper(x):\n    return x + 1\n')
+    spec = importlib.util.spec_from_file_location('helper', path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+
+    def foo(x):
+        return mod.helper(x)
+
+    k1 = function_key(foo)
+    assert function_key(foo) == k1
+    path.write_text('def helper(x):\n    return x + 2\n')
+    spec.loader.exec_module(mod)
+    assert function_key(foo) != k1
+
+
+def test_compile_cache(target_info, tmp_path):
+    cache = DiskCache(str(tmp_path))
+
+    def add(x, y):
+        return x + y
+
+    sigs = ('i64(i64, i64)', 'f64(f64, f64)')
+    m0, fids0 = _compile(target_info, add, *sigs, cache=None)
+    m1, fids1 = _compile(target_info, add, *sigs, cache=cache)
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['hits'] == 0
+    assert cache.stats()['entries'] == 2
+
+    m2, fids2 = _compile(target_info, add, *sigs, cache=cache)
+    assert cache.stats()['hits'] == 2
+    assert fids0 == fids1 == fids2
+    assert _defined_functions(m0) == _defined_functions(m1) == _defined_functions(m2)
+
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+
+
+def test_disk_cache_corrupted_entry(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set('a' * 64, 1)
+    with open(cache._filename('a' * 64), 'wb') as f:
+        f.write(b'corrupted')
+    with pytest.warns(UserWarning, match='failed to load'):
+        assert cache.get('a' * 64) is None
+    assert 'a' * 64 not in cache
+
+
+def test_compile_cache_eviction(target_info, tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=1)
+
+    def sub(x, y):
+        return x - y
+
+    _compile(target_info, sub, 'i64(i64, i64)', cache=cache)
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 0
+
+
+def test_memory_cache(target_info, tmp_path):
+    backend = DiskCache(str(tmp_path))
+    cache = MemoryCache(backend=backend)
+
+    def add(x, y):
+        return x + y
+
+    def sub(x, y):
+        return x - y
+
+    _compile(target_info, add, 'i64(i64, i64)', cache=cache)
+    assert cache.stats()['misses'] == 1
+    assert backend.stats()['entries'] == 1
+
+    with target_info:
+        sigs = {0: Type.fromstring('i64(i64, i64)')}
+        irtools.compile_to_LLVM([(add, sigs), (sub, sigs)], target_info, cache=cache)
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['entries'] == 2
+
+    # a miss is loaded from the backend
+    cache.clear()
+    m, fids = _compile(target_info, sub, 'i64(i64, i64)', cache=cache)
+    assert fids == [0]
+    assert backend.stats()['hits'] == 1
+
+    cache = MemoryCache(max_size=1)
+    _compile(target_info, add, 'i64(i64, i64)', cache=cache)
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_call_graph(target_info):
+    user_ir = """
+@used_data = global i64 1
+@unused_data = global i64 2
+@table = global i64* @used_data
+
+define i64 @get_used() noinline {
+  %p = load i64*, i64** @table
+  %v = load i64, i64* %p
+  ret i64 %v
+}
+
+define i64 @get_unused() {
+  %v = load i64, i64* @unused_data
+  ret i64 %v
+}
+"""
+    from rbc.external import external
+    get_used = external('int64 get_used(void)')
+
+    def foo(x):
+        return x + get_used()
+
+    module, fids = _compile(target_info, foo, 'i64(i64)', cache=None,
+                            user_defined_llvm_ir=user_ir)
+    assert fids == [0]
+    globals_ = {g.name for g in module.global_variables}
+    assert 'used_data' in globals_
+    assert 'table' in globals_
+    assert 'unused_data' not in globals_
+    assert 'get_unused' not in _defined_functions(module)
+
+    library = type('Library', (), dict(_final_module=module, _linking_libraries=[]))
+    graph = irtools.CallGraph(library)
+    fname = [f for f in _defined_functions(module) if f.startswith('foo')][0]
+    closure = graph.called_functions(fname)
+    assert {'get_used', fname} <= closure['defined']
+    assert {'table', 'used_data'} <= closure['globals']
+    assert graph.called_functions(fname) is closure
+
+
+def test_prune_module(target_info, capsys):
+    import math
+    import rbc.externals.stdio  # noqa: F401, required by debug mode
+
+    def hyp(x, y):
+        return math.hypot(x, y) + math.sin(x)
+
+    module, fids = _compile(target_info, hyp, 'f64(f64, f64)', 'f32(f32, f32)',
+                            cache=None, debug=True)
+    assert fids == [0, 1]
+    # only the exported functions remain defined
+    assert _defined_functions(module) == ['hyp_daddA', 'hyp_faffA']
+    size = irtools.get_module_size(module)
+    assert size['functions'] == 2
+    assert size['bytes'] == len(str(module))
+    assert 'IR size before/after pruning' in capsys.readouterr().out
+
+
+def test_call_graph_recursion(target_info):
+
+    import numba
+
+    @numba.njit
+    def fact(n):
+        if n <= 1:
+            return 1
+        return n * fact(n - 1)
+
+    def foo(n):
+        return fact(n)
+
+    module, fids = _compile(target_info, foo, 'i64(i64)', cache=None)
+    assert fids == [0]
+
+
+def test_context_pool(target_info):
+    with target_info:
+        irtools.invalidate_contexts()
+        contexts = irtools.get_contexts(target_info)
+        assert irtools.get_contexts(target_info) is contexts
+
+    def mul(x, y):
+        return x * y
+
+    m1, _ = _compile(target_info, mul, 'i64(i64, i64)', cache=None)
+    m2, _ = _compile(target_info, mul, 'f64(f64, f64)', cache=None)
+    assert _defined_functions(m1) and _defined_functions(m2)
+    with target_info:
+        assert irtools.get_contexts(target_info) is contexts
+        irtools.invalidate_contexts(target_info)
+        assert irtools.get_contexts(target_info) is not contexts
+
+
+def _many(x, y):
+    return x * y + x - y
+
+
+_many_signatures = ('i32(i32, i32)', 'i64(i64, i64)', 'f32(f32, f32)',
+                    'f64(f64, f64)', 'i16(i16, i16)', 'i8(i8, i8)')
+
+
+def test_compile_parallel(target_info):
+    m1, fids1 = _compile(target_info, _many, *_many_signatures, cache=None, workers=1)
+    m2, fids2 = _compile(target_info, _many, *_many_signatures, cache=None, workers=2)
+    assert fids1 == fids2 == list(range(len(_many_signatures)))
+    assert _defined_functions(m1) == _defined_functions(m2)
+
+
+@pytest.mark.slow
+@benchmark
+def test_compile_parallel_speedup(target_info):
+    import time
+    functions = []
+    for k in range(8):
+        def func(x, y):
+            return x * y + x - y + k
+        func.__name__ = f'many{k}'
+        sigs = {i: Type.fromstring(sig) for i, sig in enumerate(_many_signatures)}
+        functions.append((func, sigs))
+
+    def run(workers):
+        start = time.perf_counter()
+        with target_info:
+            irtools.compile_to_LLVM(functions, target_info, cache=None, workers=workers)
+        return time.perf_counter() - start
+
+    serial = run(1)
+    parallel = run(0)
+    print(f'\nserial: {serial:.3f}s, parallel: {parallel:.3f}s,'
+          f' speedup: {serial / parallel:.2f}x')
@@ -1,14 +1,17 @@
 import os
 import atexit
+import json
 import pytest
 import sys
 import ctypes
 import warnings
 import numpy as np
 from rbc.remotejit import RemoteJIT, Signature, Caller
+from rbc.errors import UnsupportedError
 from rbc.typesystem import Type
 from rbc.external import external
 from rbc.externals.macros import sizeof, cast
+from rbc.tests import benchmark
 
 win32 = sys.platform == 'win32'
 
@@ -221,6 +224,560 @@ def test_options_local(rjit):
     assert foo.local(1) == 2  # local execution
 
 
+def _harmonic(n):
+    s = 0.0
+    for i in range(n):
+        s += 1.0 / (i + 1)
+    return s
+
+
+def test_compile_options(ljit, monkeypatch):
+    from rbc import irtools
+    from rbc.remotejit import RemoteCallCapsule
+    ljit.reset()
+    sig = ljit('double(int64)', opt_level=3, fastmath=True)
+    assert 'opt_level=3' in str(sig)
+    assert 'fastmath=True' in str(sig)
+
+    with pytest.raises(ValueError, match='opt_level must be'):
+        ljit('double(int64)', opt_level=5)
+
+    harmonic_fast = sig(_harmonic)
+    harmonic = ljit('double(int64)')(_harmonic)
+    assert ' fast ' in harmonic_fast.describe()
+    assert ' fast ' not in harmonic.describe()
+
+    device = tuple(ljit.targets)[0]
+    target_info = ljit.targets[device]
+    with target_info:
+        ftype, = harmonic_fast.get_signatures()
+        assert harmonic_fast.get_compile_options(ftype) == dict(opt_level=3, fastmath=True)
+        assert harmonic.get_compile_options(ftype) == {}
+
+    compiled = []
+    compile_to_LLVM = irtools.compile_to_LLVM
+
+    def spy_compile_to_LLVM(functions_and_signatures, *args, **kwargs):
+        for func, signatures, options in functions_and_signatures:
+            compiled.append((func.__name__, options))
+        return compile_to_LLVM(functions_and_signatures, *args, **kwargs)
+
+    monkeypatch.setattr(irtools, 'compile_to_LLVM', spy_compile_to_LLVM)
+
+    # both callers share the dispatcher, call each with its own options
+    for caller in [harmonic, harmonic_fast, harmonic, harmonic_fast]:
+        capsule = RemoteCallCapsule(caller, target_info, ftype, (1000,))
+        assert capsule.execute() == pytest.approx(_harmonic(1000))
+
+    (name, options), (name_fast, options_fast) = compiled
+    assert options == {0: {}}
+    assert options_fast == {0: dict(opt_level=3, fastmath=True)}
+    assert name == '_harmonic'
+    assert name_fast.startswith('_harmonic_')
+
+
+@pytest.mark.slow
+@benchmark
+def test_compile_options_benchmark(ljit):
+    import re
+    import time
+    ljit.reset()
+    harmonic = ljit('double(int64)')(_harmonic)
+    harmonic_fast = ljit('double(int64)', opt_level=3, fastmath=True)(_harmonic)
+
+    def run(caller, n=10**7):
+        caller(1)  # compile
+        start = time.perf_counter()
+        caller(n)
+        return time.perf_counter() - start
+
+    def vector_ops(caller):
+        return len(re.findall(r'<\d+ x \w+>', caller.describe()))
+
+    t, t_fast = run(harmonic), run(harmonic_fast)
+    print(f'\ndefault: {vector_ops(harmonic)} vector operands in IR, {t:.4f}s'
+          f'\nopt_level=3, fastmath=True: {vector_ops(harmonic_fast)} vector operands in IR,'
+          f' {t_fast:.4f}s, speedup: {t / t_fast:.2f}x')
+
+
+@pytest.mark.parametrize("bitcode", [True, False])
+def test_remote_compile_bitcode(rjit, bitcode, monkeypatch):
+    rjit.reset()
+    assert rjit.client.supports('remotejit', 'compile_bitcode')
+    if not bitcode:
+        # mimic a server that does not support bitcode
+        monkeypatch.setattr(type(rjit.client), 'supports', lambda self, s, m: False)
+
+    @rjit('i64(i64)')
+    def incr(x):
+        return x + 1
+
+    assert incr(1) == 2
+
+
+def test_engine_reuse():
+    ljit = RemoteJIT(local=True)
+    dispatcher = ljit.client.dispatcher
+
+    @ljit('i64(i64)')
+    def foo(x):
+        return x + 1
+
+    @ljit('i64(i64)')
+    def bar(x):
+        return x + 2
+
+    assert foo(1) == 2
+    assert bar(1) == 3
+    assert len(dispatcher.engines) == 1
+    (fullname,) = [n for n in dispatcher.compiled_functions if n.startswith('foo')]
+
+    # redefining a function releases the module of the old definition
+    ljit.reset()
+
+    @ljit('i64(i64)')
+    def foo(x):  # noqa: F811
+        return x + 10
+
+    assert foo(1) == 11
+    assert len(dispatcher.engines) == 1
+    assert len([n for n in dispatcher.compiled_functions if n.startswith('foo')]) == 1
+
+    dispatcher.release(fullname)
+    assert fullname not in dispatcher.compiled_functions
+    assert not [s for s in dispatcher.module_symbols if s.startswith('foo')]
+
+
+_lazy_ir = '''
+@c = constant i64 3
+
+define internal i64 @add(i64 %x) {
+  %v = load i64, i64* @c
+  %y = add i64 %x, %v
+  ret i64 %y
+}
+
+define i64 @foo_lalA(i64 %x) {
+  %y = call i64 @add(i64 %x)
+  ret i64 %y
+}
+
+define i32 @foo_iaiA(i32 %x) {
+  %y = mul i32 %x, 2
+  ret i32 %y
+}
+'''
+
+
+@pytest.mark.parametrize('backend', ['mcjit', 'lazy'])
+def test_jit_backend(backend):
+    from rbc.remotejit import LocalClient
+    client = LocalClient(backend=backend)
+    dispatcher = client.dispatcher
+
+    def request(method, *args):
+        return client(remotejit={method: args})['remotejit'][method]
+
+    def jit_stats():
+        return json.loads(request('jit_stats'))
+
+    request('compile', 'foo', '_lalA;_iaiA', _lazy_ir)
+    stats = jit_stats()
+    assert stats['backend'] == backend
+    assert stats['functions'] == 2
+    assert stats['materialized'] == (0 if backend == 'lazy' else 2)
+
+    assert request('call', 'foo_lalA', (1,)) == 4
+    stats = jit_stats()
+    assert stats['materialized'] == 2 - (backend == 'lazy')
+    assert stats['summary']['jit.materialize']['count'] == 1
+    assert request('call', 'foo_iaiA', (5,)) == 10
+    assert jit_stats()['materialized'] == 2
+
+    # redefining releases all materialized modules
+    request('compile', 'foo', '_iaiA', _lazy_ir.replace('mul', 'add'))
+    assert 'foo_lalA' not in dispatcher.compiled_functions
+    assert request('call', 'foo_iaiA', (5,)) == 7
+
+
+@pytest.mark.parametrize('backend', ['mcjit', 'lazy'])
+def test_object_cache(backend, tmp_path):
+    from rbc.remotejit import LocalClient
+    from rbc import irtools
+    irtools.set_compile_cache(str(tmp_path))
+    try:
+        client = LocalClient(backend=backend)
+        client2 = LocalClient(backend=backend)
+    finally:
+        irtools.set_compile_cache(irtools.UNSPECIFIED)
+
+    def request(client, method, *args):
+        return client(remotejit={method: args})['remotejit'][method]
+
+    def object_cache(client):
+        return json.loads(request(client, 'jit_stats'))['object_cache']
+
+    request(client, 'compile', 'foo', '_lalA;_iaiA', _lazy_ir)
+    assert request(client, 'call', 'foo_lalA', (1,)) == 4
+    stats = object_cache(client)
+    assert (stats['hits'], stats['misses'], stats['entries']) == (0, 1, 1)
+
+    # compiling the same IR again relinks the cached object code
+    request(client, 'compile', 'foo', '_lalA;_iaiA', _lazy_ir)
+    assert request(client, 'call', 'foo_lalA', (1,)) == 4
+    stats = object_cache(client)
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+    # another server process finds the object code in the persistent cache
+    request(client2, 'compile', 'foo', '_lalA;_iaiA', _lazy_ir)
+    assert request(client2, 'call', 'foo_lalA', (1,)) == 4
+    stats = object_cache(client2)
+    assert stats['backend']['hits'] == 1
+
+
+def test_jit_backend_server():
+    rjit = RemoteJIT(port=11533)
+    with pytest.raises(ValueError, match='unknown JIT backend'):
+        rjit.start_server(background=True, backend='orc')
+    rjit.start_server(background=True, backend='lazy')
+    try:
+        @rjit('i64(i64)')
+        def incr(x):
+            return x + 1
+
+        assert incr(1) == 2
+        stats = rjit.retrieve_jit_stats()
+        assert stats['backend'] == 'lazy'
+        assert stats['materialized'] == 1
+    finally:
+        rjit.stop_server()
+
+
+def test_protocol_transport_server():
+    import asyncio
+    rjit = RemoteJIT(port=11534, protocol='compact', transport='framed')
+    rjit.start_server(background=True)
+    try:
+        @rjit('i64(i64)')
+        def incr(x):
+            return x + 1
+
+        assert incr(1) == 2
+        assert asyncio.run(incr.acall(2)) == 3
+    finally:
+        rjit.stop_server()
+
+
+def test_dispatch_table(monkeypatch):
+    ljit = RemoteJIT(local=True)
+    calls = []
+    best_match = Signature.best_match
+
+    def counting_best_match(self, func, atypes):
+        calls.append(atypes)
+        return best_match(self, func, atypes)
+
+    monkeypatch.setattr(Signature, 'best_match', counting_best_match)
+
+    @ljit('i64(i64)')
+    def foo(x):
+        return x + 1
+
+    assert [foo(i) for i in range(5)] == [1, 2, 3, 4, 5]
+    assert len(calls) == 1
+    # int32 argument is a new dispatch key
+    assert foo(np.int32(1)) == 2
+    assert foo(np.int32(2)) == 3
+    assert len(calls) == 2
+
+    # adding a caller invalidates the dispatch table
+    @ljit('f64(f64)')
+    def foo(x):  # noqa: F811
+        return x + 0.5
+
+    assert foo(1.5) == 2.0
+    assert len(calls) == 4
+    assert foo(2) == 3
+    assert len(calls) == 6
+
+    # refreshing targets invalidates the dispatch table
+    ljit._targets = None
+    assert foo(1.5) == 2.0
+    assert len(calls) == 8
+    assert foo(1.5) == 2.0
+    assert len(calls) == 8
+
+    # extending the signature of a caller invalidates the dispatch table
+    @ljit('f64(f64)')
+    def bar(x):
+        return x + 1
+
+    assert bar(1) == 2.0 and isinstance(bar(1), float)
+    bar.signature('i64(i64)')
+    assert bar(1) == 2 and isinstance(bar(1), int)
+
+    assert ljit.get_dispatch_key(1, 2.0, ctypes.c_void_p(0)) == (int, float, ctypes.c_void_p)
+    assert ljit.get_dispatch_key(1, np.zeros(3)) is None
+
+
+def test_normalized_cache(monkeypatch):
+    ljit = RemoteJIT(local=True)
+    target_info = ljit.targets[tuple(ljit.targets)[0]]
+    calls = []
+    _normalized = Signature._normalized
+
+    def counting_normalized(self, func, target_info):
+        calls.append(func)
+        return _normalized(self, func, target_info)
+
+    monkeypatch.setattr(Signature, '_normalized', counting_normalized)
+
+    @ljit('T(T)', T=['i64', 'i32', 'f64'])
+    def foo(x):
+        return x + 1
+
+    assert foo(1) == 2
+    assert foo(2.5) == 3.5
+    n = len(calls)
+    assert n >= 1
+    assert foo(3) == 4
+    assert len(calls) == n
+
+    with target_info:
+        sig1 = foo.signature.normalized(foo.func)
+        assert foo.signature.normalized(foo.func) is sig1
+        assert len(sig1.signatures) == 3
+        with Type.alias(myint='int64'):
+            assert foo.signature.normalized(foo.func) is not sig1
+
+        # adding signatures invalidates the cache
+        foo.signature('i16(i16)')
+        sig2 = foo.signature.normalized(foo.func)
+        assert sig2 is not sig1
+        assert len(sig2.signatures) == 4
+
+
+def test_map(rjit):
+
+    @rjit('f64(f64, i64)', 'i32(i32, i32)')
+    def mul(x, y):
+        return x * y
+
+    @rjit('bool(i64)')
+    def odd(x):
+        return x % 2 == 1
+
+    r = mul.map([(1.5, 2), (2.5, 3)])
+    assert r.dtype == np.float64
+    np.testing.assert_equal(r, [3.0, 7.5])
+    r = mul.map(zip(range(5), range(5)), chunksize=2)
+    assert r.dtype == np.int32
+    np.testing.assert_equal(r, [0, 1, 4, 9, 16])
+    r = odd.map(range(5))
+    assert r.dtype == np.bool_
+    np.testing.assert_equal(r, [False, True, False, True, False])
+    r = odd.map([])
+    assert len(r) == 0 and r.dtype == np.bool_
+    # overloads with different return types
+    assert mul.map([]).dtype == np.float64
+
+
+@pytest.mark.parametrize("location", ['local', 'remote'])
+def test_vectorized(ljit, rjit, location, monkeypatch):
+    jit = rjit if location == 'remote' else ljit
+
+    @jit('f64(f64, f64)', 'i64(i64, i64)')
+    def add(x, y):
+        return x + y
+
+    @jit('bool(i64)')
+    def odd(x):
+        return x % 2 == 1
+
+    x = np.arange(6, dtype=np.float64).reshape(2, 3)
+    np.testing.assert_equal(add(x, x), x + x)
+    np.testing.assert_equal(add(x, 1.5), x + 1.5)
+    r = add(np.arange(3), 2)
+    assert r.dtype == np.int64
+    np.testing.assert_equal(r, [2, 3, 4])
+    r = odd(np.arange(4))
+    assert r.dtype == np.bool_
+    np.testing.assert_equal(r, [False, True, False, True])
+    assert add(np.array([]), np.array([])).shape == (0,)
+    assert add(1, 2) == 3
+
+    @jit('void(f64)')
+    def noop(x):
+        pass
+
+    with pytest.raises(TypeError, match='cannot vectorize'):
+        noop(np.arange(3.0))
+
+    with pytest.raises(UnsupportedError, match='cannot hold element-wise call'):
+        add(x, x, hold=True)
+    monkeypatch.setattr(jit, 'default_remote_call_hold', True)
+    with pytest.raises(UnsupportedError, match='cannot hold element-wise call'):
+        add(x, x)
+    np.testing.assert_equal(add(x, x, hold=False), x + x)
+
+
+def test_shared_memory_pool():
+    from rbc.shared_memory import SharedMemoryPool, attach, ndarray
+    pool = SharedMemoryPool(maxsize=1)
+    a = pool.acquire(10)
+    b = pool.acquire(10 ** 6)
+    assert a.size >= 10 and b.size >= 10 ** 6
+    ndarray(a, (3,), np.int64)[:] = [1, 2, 3]
+    np.testing.assert_equal(ndarray(attach(a.name), (3,), np.int64), [1, 2, 3])
+    pool.release(a)
+    pool.release(b)  # exceeds maxsize, b is unlinked
+    assert pool.acquire(5) is a
+    assert pool.stats['created'] == 2 and pool.stats['reused'] == 1
+    assert pool.stats['size'] == a.size
+    pool.close()
+    assert pool.stats['size'] == 0
+
+
+def test_vectorized_shared_memory(rjit, monkeypatch):
+    monkeypatch.setattr(rjit, 'shared_memory_threshold', 0)
+    calls = []
+    call_vectorized_shared = RemoteJIT._remote_call_vectorized_shared
+
+    def counting_call_vectorized_shared(self, fullname, ftype, arguments):
+        calls.append(fullname)
+        return call_vectorized_shared(self, fullname, ftype, arguments)
+
+    monkeypatch.setattr(RemoteJIT, '_remote_call_vectorized_shared',
+                        counting_call_vectorized_shared)
+
+    @rjit('f64(f64, i64)')
+    def fma(x, y):
+        return x * 2 + y
+
+    @rjit('bool(i64)')
+    def odd(x):
+        return x % 2 == 1
+
+    x = np.arange(6, dtype=np.float64).reshape(2, 3)
+    np.testing.assert_equal(fma(x, 3), x * 2 + 3)
+    np.testing.assert_equal(fma(x[::-1], 1), x[::-1] * 2 + 1)
+    np.testing.assert_equal(odd(np.arange(4)), [False, True, False, True])
+    assert len(calls) == 3
+    assert rjit.shared_memory_pool.stats['reused'] >= 3
+
+    # shared memory is not used when disabled
+    monkeypatch.setattr(rjit, 'shared_memory', False)
+    np.testing.assert_equal(fma(x, 3), x * 2 + 3)
+    assert len(calls) == 3
+
+
+@pytest.mark.slow
+@benchmark
+def test_shared_memory_benchmark(rjit, monkeypatch):
+    import time
+
+    @rjit('f64(f64, f64)')
+    def add(x, y):
+        return x + y
+
+    x = np.ones(2 ** 24)  # 128 MB
+    timings = {}
+    for shared_memory in [False, True]:
+        monkeypatch.setattr(rjit, 'shared_memory', shared_memory)
+        add(x, x)
+        start = time.perf_counter()
+        r = add(x, x)
+        timings[shared_memory] = time.perf_counter() - start
+        np.testing.assert_equal(r, 2.0)
+    print(f'\nvectorized call on 2x{x.nbytes >> 20} MB arrays: {timings[False]:.3f}s via'
+          f' thrift, {timings[True]:.3f}s via shared memory')
+
+
+@pytest.mark.parametrize("location", ['local', 'remote'])
+def test_acall(ljit, rjit, location, monkeypatch):
+    import asyncio
+    jit = rjit if location == 'remote' else ljit
+    compiles = []
+    aremote_compile = RemoteJIT.aremote_compile
+
+    async def counting_aremote_compile(self, func, ftype, target_info, **kwargs):
+        compiles.append(ftype)
+        return await aremote_compile(self, func, ftype, target_info, **kwargs)
+
+    monkeypatch.setattr(RemoteJIT, 'aremote_compile', counting_aremote_compile)
+
+    @jit('i64(i64, i64)', 'f64(f64, f64)')
+    def asub(x, y):
+        return x - y
+
+    async def main():
+        r = await asub.acall(5, 2)
+        assert r == 3
+        results = await asyncio.gather(
+            *[asub.acall(i, 1) for i in range(20)],
+            *[asub.acall(i + 0.5, 1.0) for i in range(20)])
+        assert results == [i - 1 for i in range(20)] + [i - 0.5 for i in range(20)]
+        with pytest.raises(TypeError, match='found no matching function signature'):
+            await asub.acall(1j, 2)
+
+    asyncio.run(main())
+    # concurrent calls share the remote compile requests
+    assert len(compiles) == 2
+    assert asub(3, 1) == 2
+
+
+@pytest.mark.parametrize('backend', ['mcjit', 'lazy'])
+def test_call_many(backend, monkeypatch):
+    from rbc import irtools
+    from rbc.remotejit import LocalClient
+    client = LocalClient(backend=backend)
+    dispatcher = client.dispatcher
+
+    def request(method, *args):
+        return client(remotejit={method: args})['remotejit'][method]
+
+    request('compile', 'foo', '_lalA;_iaiA', _lazy_ir)
+    x = np.arange(5, dtype=np.int64)
+    np.testing.assert_equal(request('call_many', 'foo_lalA', (x,)), x + 3)
+    np.testing.assert_equal(request('call_many', 'foo_iaiA', (x,)), 2 * x)
+    assert dispatcher.map_functions['foo_lalA'][1] is not None
+
+    # redefining releases the native loops
+    request('compile', 'foo', '_iaiA', _lazy_ir.replace('mul', 'add'))
+    assert 'foo_iaiA' not in dispatcher.map_functions
+    np.testing.assert_equal(request('call_many', 'foo_iaiA', (x,)), x + 2)
+
+    # without native loop, the function is called one by one
+    monkeypatch.setattr(irtools, 'make_map_function', lambda mod, name: None)
+    request('compile', 'foo', '_lalA', _lazy_ir)
+    np.testing.assert_equal(request('call_many', 'foo_lalA', (x,)), x + 3)
+    assert dispatcher.map_functions['foo_lalA'][1] is None
+
+
+@pytest.mark.slow
+@benchmark
+def test_map_benchmark(rjit):
+    import time
+
+    @rjit('f64(f64, i64)')
+    def axpy(x, y):
+        return 2.5 * x + y
+
+    n = 1000
+    args = list(zip(np.linspace(0, 1, n), range(n)))
+    expected = np.array([axpy(*a) for a in args])
+    start = time.perf_counter()
+    for a in args:
+        axpy(*a)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    r = axpy.map(args)
+    batched = time.perf_counter() - start
+    np.testing.assert_equal(r, expected)
+    print(f'\n{n} calls: single {single * 1e3:.1f}ms, map {batched * 1e3:.1f}ms')
+
+
 def test_composition(rjit):
     import numba as nb
 
@@ -0,0 +1,61 @@
+import json
+import pytest
+from rbc import irtools
+from rbc.remotejit import RemoteJIT
+from rbc.stats import CompileStats
+from rbc.typesystem import Type
+
+
+@pytest.fixture(scope="module")
+def ljit():
+    return RemoteJIT(local=True)
+
+
+def test_record():
+    stats = CompileStats(max_records=2)
+    with stats.record('a', function='foo'):
+        pass
+    stats.add('b', 1.0, 0.5)
+    stats.add('b', 2.0)
+    assert len(stats.records) == 2
+    summary = stats.summary()
+    assert summary['b'] == dict(count=2, wall=3.0, cpu=0.5)
+    data = json.loads(stats.tojson())
+    assert data['summary']['b']['count'] == 2
+    assert data['records'][0]['phase'] == 'b'
+    stats.clear()
+    assert stats.summary() == {}
+
+
+def test_compile_to_LLVM(ljit):
+    target_info = ljit.targets['cpu']
+    stats = CompileStats()
+
+    def foo(x):
+        return x + 1
+
+    with target_info:
+        sigs = {0: Type.fromstring('i64(i64)'), 1: Type.fromstring('f64(f64)')}
+        irtools.compile_to_LLVM([(foo, sigs)], target_info, cache=None, stats=stats)
+
+    phases = stats.summary()
+    for phase in ['numba', 'numba.typing', 'numba.lowering', 'make_wrapper',
+                  'link', 'prune', 'optimize', 'compile_to_LLVM']:
+        assert phase in phases, phase
+    assert phases['numba']['count'] == 2
+    assert set(stats.summary(by='signature')) == {'int64(int64)', 'float64(float64)', None}
+    assert set(stats.summary(by='device')) == {target_info.name}
+
+
+def test_remotejit_stats(ljit):
+    ljit.compile_stats.clear()
+
+    @ljit('i32(i32)')
+    def bar(x):
+        return x * 2
+
+    assert bar(3) == 6
+    phases = ljit.compile_stats.summary()
+    assert phases['serialize']['count'] == 1
+    assert phases['remote_compile']['count'] == 1
+    assert phases['numba']['count'] == 1
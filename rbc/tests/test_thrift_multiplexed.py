@@ -2,9 +2,10 @@
 import os
 import pytest
 import numpy as np
-from rbc.thrift import (Server, Client, Dispatcher, Buffer, NDArray,
+from rbc.thrift import (Server, Client, AsyncClient, Dispatcher, Buffer, NDArray,
                         dispatchermethod, Data)
 from rbc.utils import get_local_ip
+from rbc.tests import benchmark
 
 socket_options = dict(host=get_local_ip(), port=6325)
 
@@ -133,6 +134,30 @@ def test_ndarray_transport(server):
     np.testing.assert_equal(r['test']['test_ndarray_transport'], arr)
 
 
+def test_ndarray_strided_transport(server):
+    conn = Client(**socket_options)
+    thrift = conn.thrift
+    a = np.arange(24.).reshape(4, 6)
+    arrays = [a.T, np.asfortranarray(a), a[::-1, ::2], a[:, ::3], a[:, :1],
+              np.broadcast_to(np.arange(3), (4, 3)), np.zeros((0, 3)), np.array(5)]
+    for arr in arrays:
+        r = conn(test=dict(test_ndarray_transport=(arr,)))
+        np.testing.assert_equal(r['test']['test_ndarray_transport'], arr)
+        assert r['test']['test_ndarray_transport'].shape == arr.shape
+
+    # strides are sent instead of copying the data
+    r = NDArray(thrift, a[::-1, ::2])
+    assert r.strides == [-48, 16] and r.offset == 144
+    assert np.shares_memory(np.frombuffer(r.data, np.uint8), a)
+    # sparse arrays are copied
+    r = NDArray(thrift, a[:, :1])
+    assert r.strides is None and r.data.nbytes == 32
+
+    r = conn(test=dict(test_buffer_transport=(a.T,)))
+    np.testing.assert_equal(r['test']['test_buffer_transport'],
+                            np.frombuffer(a.T.tobytes(), np.uint8))
+
+
 def test_ndarray_transport2(server):
     conn = Client(**socket_options)
     arr = np.array([1, 2, 3, 4], dtype=np.int64)
@@ -247,3 +272,200 @@ def test_exception(server):
             ValueError,
             match="my exception"):
         conn(test=dict(test_exception=()))
+
+
+def test_thrift_cache(server, tmp_path, monkeypatch):
+    from rbc.thrift import utils
+    monkeypatch.setenv('RBC_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(utils, '_thrift_modules', {})
+    monkeypatch.setattr(utils, '_thrift_contents', {})
+    conn = Client(**socket_options)
+    content_hash = utils.get_thrift_content_hash(conn.thrift_content)
+    assert Client(**socket_options).thrift is conn.thrift
+
+    # thrift content is retrieved from the persistent cache
+    utils._thrift_contents.clear()
+    cache = utils.get_thrift_cache()
+    assert content_hash in cache
+    hits = cache.hits
+    conn2 = Client(**socket_options)
+    assert cache.hits == hits + 1
+    assert conn2.thrift is conn.thrift
+    r = conn2(test=dict(test_str_transport=('hello',)))
+    assert r['test']['test_str_transport'] == 'hello'
+
+
+def test_connection_pool(server):
+    import socket
+    conn = Client(pool_maxsize=2, **socket_options)
+    pool = conn.get_connection_pool('test')
+    assert conn(test=dict(test_str_transport=('a',)))['test']['test_str_transport'] == 'a'
+    assert conn(test=dict(test_str_transport=('b',)))['test']['test_str_transport'] == 'b'
+    assert pool.stats == dict(created=1, reused=1, discarded=0)
+
+    # clients of the same server share the pool
+    conn2 = Client(pool_maxsize=2, **socket_options)
+    assert conn2.get_connection_pool('test') is pool
+
+    # server exceptions do not discard connections
+    with pytest.raises(ValueError, match="my exception"):
+        conn(test=dict(test_exception=()))
+    assert len(pool._idle) == 1
+
+    # broken connections are replaced
+    pool._idle[0].socket.sock.shutdown(socket.SHUT_RDWR)
+    assert conn(test=dict(test_str_transport=('c',)))['test']['test_str_transport'] == 'c'
+    assert pool.stats['discarded'] == 1
+
+    # expired connections are replaced
+    pool.idle_timeout = 0
+    assert conn(test=dict(test_str_transport=('d',)))['test']['test_str_transport'] == 'd'
+    assert pool.stats['discarded'] == 2
+    pool.close()
+    assert not pool._idle
+
+
+@pytest.mark.slow
+@benchmark
+def test_connection_pool_benchmark(server):
+    import timeit
+    rates = {}
+    for maxsize in [0, 8]:
+        conn = Client(pool_maxsize=maxsize, **socket_options)
+        query = dict(test=dict(test_str_transport=('hello',)))
+        conn(**query)
+        elapsed = min(timeit.repeat(lambda: conn(**query), number=200, repeat=3))
+        rates[maxsize] = 200 / elapsed
+    print(f'\ncalls per second: without pool {rates[0]:.0f}, with pool {rates[8]:.0f}')
+
+
+def test_async_client(server):
+    import asyncio
+    conn = AsyncClient(pool_size=2, **socket_options)
+
+    async def main():
+        results = await asyncio.gather(
+            *[conn(test=dict(test_str_transport=(str(i),))) for i in range(10)])
+        assert [r['test']['test_str_transport'] for r in results] == list(map(str, range(10)))
+        # connections are reused
+        assert len(conn._pools['test'][1]) == 2
+        with pytest.raises(ValueError, match="my exception"):
+            await conn(test=dict(test_exception=()))
+        r = await conn(test=dict(test_void=()))
+        assert r['test']['test_void'] is None
+        conn.close()
+
+    asyncio.run(main())
+
+
+thrift_stacks = [('binary', 'buffered'), ('binary', 'framed'),
+                 ('compact', 'buffered'), ('compact', 'framed')]
+
+
+def run_stack_server(protocol, transport, port):
+    test_thrift_file = os.path.join(os.path.dirname(__file__),
+                                    'test_multiplexed.thrift')
+    options = dict(socket_options, port=port, protocol=protocol, transport=transport)
+    return Server.run_bg(DispatcherTest, test_thrift_file, options)
+
+
+@pytest.fixture(scope="module", params=thrift_stacks, ids='-'.join)
+def stack_server(request):
+    protocol, transport = request.param
+    port = socket_options['port'] + 1 + thrift_stacks.index(request.param)
+    ps = run_stack_server(protocol, transport, port)
+    yield dict(socket_options, port=port, protocol=protocol, transport=transport)
+    if ps.is_alive():
+        ps.terminate()
+
+
+def test_protocol_transport(stack_server):
+    import asyncio
+    arr = np.arange(10, dtype=np.float64)
+    for options in [dict(), dict(pool_maxsize=0), dict(accelerated=False)]:
+        conn = Client(**stack_server, **options)
+        r = conn(test=dict(test_ndarray_transport=(arr,),
+                           test_str_transport=('hello',)))
+        np.testing.assert_equal(r['test']['test_ndarray_transport'], arr)
+        assert r['test']['test_str_transport'] == 'hello'
+
+    aconn = AsyncClient(**stack_server)
+
+    async def main():
+        r = await aconn(test=dict(test_str_transport=('hello',)))
+        assert r['test']['test_str_transport'] == 'hello'
+        aconn.close()
+
+    asyncio.run(main())
+
+
+def test_unknown_protocol_transport():
+    from rbc.thrift import utils
+    with pytest.raises(ValueError, match="unknown thrift protocol 'json'"):
+        utils.get_protocol_factory('json')
+    with pytest.raises(ValueError, match="unknown thrift transport 'http'"):
+        utils.get_transport_factory('http')
+
+
+@pytest.mark.slow
+@benchmark
+def test_protocol_transport_benchmark():
+    import timeit
+    port = socket_options['port'] + 1 + len(thrift_stacks)
+    processes = [run_stack_server(protocol, transport, port + i)
+                 for i, (protocol, transport) in enumerate(thrift_stacks)]
+    arr = np.arange(100000, dtype=np.float64)
+    query = dict(test=dict(test_ndarray_transport=(arr,)))
+    try:
+        print()
+        for i, (protocol, transport) in enumerate(thrift_stacks):
+            for accelerated in [False, True]:
+                conn = Client(**dict(socket_options, port=port + i), protocol=protocol,
+                              transport=transport, accelerated=accelerated)
+                conn(**query)
+                elapsed = min(timeit.repeat(lambda: conn(**query), number=20, repeat=3))
+                print(f'{protocol}-{transport} (accelerated={accelerated}):'
+                      f' {20 / elapsed:.0f} calls per second')
+    finally:
+        for ps in processes:
+            ps.terminate()
+
+
+@pytest.mark.slow
+@benchmark
+def test_ndarray_memory_benchmark():
+    import tracemalloc
+    from rbc.thrift import utils
+    from thriftpy2.protocol.binary import TBinaryProtocol
+    thrift_file = os.path.join(os.path.dirname(utils.__file__), 'types.thrift')
+    with open(thrift_file) as f:
+        thrift = utils.load_thrift(f.read())
+
+    class NullTransport:
+        # discards the written data like a socket
+        def write(self, data):
+            pass
+
+    def peak(func, arr):
+        tracemalloc.start()
+        try:
+            TBinaryProtocol(NullTransport()).write_struct(func(arr))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def copying(arr):
+        return thrift.NDArray(shape=list(arr.shape), typestr=arr.dtype.str,
+                              data=arr.tobytes())
+
+    def zerocopy(arr):
+        return NDArray(thrift, arr)
+
+    arr = np.ones((4096, 4096), dtype=np.float64)  # 128 MB
+    print()
+    for label, a in [('C-contiguous', arr), ('transposed', arr.T), ('reversed', arr[::-1])]:
+        peaks = [peak(func, a) for func in [copying, zerocopy]]
+        print(f'{label} {a.nbytes >> 20} MB array: peak memory {peaks[0] >> 20} MB'
+              f' with copying, {peaks[1] >> 20} MB with zero-copy')
+        assert peaks[0] >= a.nbytes
+        assert peaks[1] < a.nbytes // 100
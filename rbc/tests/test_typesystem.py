@@ -21,6 +21,7 @@ import pytest
 from rbc.typesystem import Type, get_signature
 from rbc.utils import get_datamodel
 from rbc.targetinfo import TargetInfo
+from rbc.tests import benchmark
 
 
 if nb is not None:
@@ -630,3 +631,152 @@ def test_copy(target_info):
     t.annotation(b=1)
     assert str(t) == 'int32 foo | a=1 | b=1'
     assert str(t2) == 'int32 foo | a=1'
+
+
+def test_fromstring_cache(target_info):
+    from rbc.typesystem import _fromstring_cached
+    _fromstring_cached.cache_clear()
+    t1 = Type.fromstring('Column<Array<double>> x')
+    t2 = Type.fromstring('Column<Array<double>> x')
+    assert _fromstring_cached.cache_info().hits == 1
+    assert t1 == t2 and t1 is not t2
+
+    # modifying the result does not affect the cache
+    t1.annotation(foo='bar')
+    t1[0][1].annotation(bar='foo')
+    t3 = Type.fromstring('Column<Array<double>> x')
+    assert t3.annotation() == {}
+    assert t3[0][1].annotation() == {}
+    assert t3.name == 'x'
+
+    # aliases are part of the cache key
+    with Type.alias(double='float32'):
+        assert Type.fromstring('double') == Type('float32')
+    assert Type.fromstring('double') == Type('float64')
+
+    # so is the target
+    misses = _fromstring_cached.cache_info().misses
+    with TargetInfo.dummy():
+        assert Type.fromstring('double') == Type('float64')
+    assert _fromstring_cached.cache_info().misses == misses + 1
+
+
+@pytest.mark.slow
+@benchmark
+def test_fromstring_benchmark(target_info):
+    import timeit
+    from rbc.typesystem import _fromstring
+    signatures = [
+        'Column<Array<double>>',
+        'int32(Cursor<Column<int64>, Column<Array<double>>, Column<TextEncodingDict>>,'
+        ' RowMultiplier, OutputColumn<int64>, OutputColumn<Array<double>>)',
+        'UDTF(TableFunctionManager, Cursor<Column<T> x, Column<T> y>, T a | default=1,'
+        ' OutputColumn<T> z | input_id=args<0>) -> int32',
+    ]
+    for s in signatures:
+        uncached = min(timeit.repeat(lambda: _fromstring(Type, s), number=200, repeat=3))
+        cached = min(timeit.repeat(lambda: Type.fromstring(s), number=200, repeat=3))
+        print(f'\n{s[:40]}...: uncached {uncached / 200 * 1e6:.1f}us,'
+              f' cached {cached / 200 * 1e6:.1f}us')
+
+
+def test_intern(target_info):
+    s = 'int32(Column<Array<double>> x, int64 | input_id=1)'
+    t1 = Type.fromstring(s)
+    t2 = Type.fromstring(s)
+    i1 = t1.intern()
+    assert i1.is_interned and not t1.is_interned
+    assert i1 is t2.intern()
+    assert i1 == t1 and hash(i1) == hash(t1)
+    assert i1.is_function and i1.name == '' and i1[1][0].name is None
+    assert i1[1][0] is t1[1][0].intern()
+    assert str(i1) == 'int32(Column<Array<float64>>, int64)'
+    assert i1 != Type.fromstring('int32(Column<Array<float>>, int64)')
+
+    # interned types are not modified in-place
+    with pytest.raises(TypeError, match='cannot annotate interned type'):
+        i1.annotation(foo='bar')
+    t3 = i1.params(typename='Foo')
+    assert t3 is not i1 and not t3.is_interned and t3._params['typename'] == 'Foo'
+    assert 'typename' not in i1._params
+    t4 = i1 | dict(foo='bar')
+    assert t4.annotation() == dict(foo='bar')
+    assert dict(i1.annotation()) == {}
+    assert t4.intern() is i1
+
+    # modifying the parameters of a type does not change its interned type
+    t1.annotation(foo='bar')
+    assert t1.intern() is i1
+
+
+def test_intern_copies(target_info):
+    import copy
+    import pickle
+    t = Type.fromstring('int64(float64, int32*)')
+    d = {t: 1}
+    i = t.intern()
+    for u in [t, i, t[1][0]]:
+        for v in [pickle.loads(pickle.dumps(u)), copy.deepcopy(u), copy.copy(u)]:
+            assert v == u and hash(v) == hash(u)
+            assert not v.is_interned
+            assert v.intern() is u.intern()
+        assert pickle.loads(pickle.dumps(u)) != Type.fromstring('int32(float64, int32*)')
+    assert d[pickle.loads(pickle.dumps(t))] == 1
+    assert d[copy.deepcopy(i)] == 1
+
+
+def test_intern_table_bounded(target_info, monkeypatch):
+    import pickle
+    from rbc import typesystem
+    monkeypatch.setattr(typesystem, '_interned_types', {})
+    monkeypatch.setattr(typesystem, '_max_interned_types', 4)
+    t = Type.fromstring('int64(float64, int32*)')
+    u = Type.fromstring('int32(float64, int32*)')
+    i, j = t.intern(), u.intern()
+    assert i != j
+    for n in range(10):
+        Type.fromstring(f'foo{n}').intern()
+    assert len(typesystem._interned_types) <= 4
+    # equal types interned in different generations are equal
+    i2 = pickle.loads(pickle.dumps(t)).intern()
+    j2 = pickle.loads(pickle.dumps(u)).intern()
+    assert i2 is not i and i2 == i and hash(i2) == hash(i)
+    assert i2 != j and j2 != i and j2 == j
+
+
+def test_match_penalties(target_info):
+    from rbc.typesystem import _scalar_match_penalties
+    names = ['bool', 'int8', 'int32', 'int64', 'uint16', 'float32', 'float64',
+             'complex64', 'complex128']
+    for a in names:
+        for b in names:
+            ta, tb = Type.fromstring(a), Type.fromstring(b)
+            assert _scalar_match_penalties[a, b] == ta._match(tb) == ta.match(tb)
+    assert Type.fromstring('float64').match(Type.fromstring('int32')) == 1000
+    assert Type.fromstring('int32').match(Type.fromstring('float64')) is None
+    # non-standard atomic types are added on first use
+    assert Type('foo').match(Type('foo')) == 0
+    assert _scalar_match_penalties['foo', 'foo'] == 0
+
+
+@pytest.mark.slow
+@benchmark
+def test_match_benchmark(target_info, monkeypatch):
+    import timeit
+    scalars = ['int8', 'int16', 'int32', 'int64', 'uint8', 'uint16', 'uint32',
+               'uint64', 'float32', 'float64', 'bool']
+    overloads = [Type.fromstring(f'int32({a}, {b}, {c})')
+                 for a in scalars for b in scalars for c in scalars[::3]]
+    atypes = tuple(map(Type.fromstring, ['float32', 'int16', 'uint8']))
+
+    def best_match():
+        return min((t.match(atypes), i) for i, t in enumerate(overloads)
+                   if t.match(atypes) is not None)
+
+    expected = best_match()
+    fast = min(timeit.repeat(best_match, number=20, repeat=3))
+    monkeypatch.setattr(Type, 'match', Type._match)
+    assert best_match() == expected
+    slow = min(timeit.repeat(best_match, number=20, repeat=3))
+    print(f'\n{len(overloads)} overloads: penalty table {fast / 20 * 1e3:.2f}ms,'
+          f' general matcher {slow / 20 * 1e3:.2f}ms')
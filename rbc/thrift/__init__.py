@@ -1,6 +1,6 @@
 
 from .server import Server                # noqa: F401
-from .client import Client                # noqa: F401
+from .client import Client, AsyncClient   # noqa: F401
 from .dispatcher import Dispatcher        # noqa: F401
 from .types import Buffer, NDArray, Data  # noqa: F401
 from .utils import dispatchermethod       # noqa: F401
@@ -7,17 +7,21 @@ method `thrift_content`).
 # Author: Pearu Peterson
 # Created: February 2019
 
-import os
-import tempfile
+import time
+import select
+import asyncio
 import warnings
+import contextlib
 from threading import Lock
 with warnings.catch_warnings():
     warnings.simplefilter("ignore")
     import thriftpy2 as thr
     import thriftpy2.rpc
+    import thriftpy2.contrib.aio.rpc
 import pickle
 import six
 from . import types
+from . import utils
 
 
 # lock to prevent more than one thread from initializing the thrift client
@@ -64,11 +68,161 @@ def from_thrift(thrift, spec, result):
     raise NotImplementedError(repr((t, type(result))))
 
 
+class Connection(object):
+    """Persistent transport and protocol of a thrift service.
+    """
+
+    def __init__(self, socket, transport, protocol):
+        self.socket = socket
+        self.transport = transport
+        self.protocol = protocol
+        self.last_used = time.monotonic()
+
+    def is_healthy(self):
+        """Check if the connection is open and not closed by the
+        server.
+        """
+        sock = self.socket.sock
+        if sock is None:
+            return False
+        try:
+            # an idle connection is readable only when it is closed
+            # by the server
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def close(self):
+        self.transport.close()
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of persistent connections to a thrift service.
+
+    Parameters
+    ----------
+    service_name : str
+      Specify the service name used by the multiplexed protocol.
+    multiplexed : bool
+      When True, use multiplexed protocol.
+    protocol, transport, accelerated :
+      Specify the protocol and transport stack, see
+      `utils.get_protocol_factory` and `utils.get_transport_factory`.
+    maxsize : int
+      Specify the maximal number of idle connections kept in the
+      pool.
+    idle_timeout : float
+      Specify the time in seconds after which an idle connection is
+      closed.
+    options : dict
+      Specify the socket options: host, port, unix_socket,
+      socket_family, socket_timeout, connect_timeout, and SSL options
+      of thriftpy2.transport.TSSLSocket.
+    """
+
+    def __init__(self, service_name, multiplexed=True, maxsize=8, idle_timeout=60,
+                 protocol='binary', transport='buffered', accelerated=True, **options):
+        self.service_name = service_name
+        self.multiplexed = multiplexed
+        self.protocol = protocol
+        self.transport = transport
+        self.accelerated = accelerated
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.options = options
+        self._idle = []
+        self._lock = Lock()
+        self.stats = dict(created=0, reused=0, discarded=0)
+
+    def _connect(self):
+        options = dict(self.options)
+        if 'timeout' in options:
+            timeout = options.pop('timeout')
+            options.setdefault('socket_timeout', timeout)
+            options.setdefault('connect_timeout', timeout)
+        ssl_keys = ('ssl_context', 'validate', 'cafile', 'capath', 'certfile', 'keyfile',
+                    'ciphers')
+        if any(options.get(k) for k in ('ssl_context', 'cafile')):
+            socket = thr.transport.TSSLSocket(**options)
+        else:
+            for k in ssl_keys:
+                options.pop(k, None)
+            socket = thr.transport.TSocket(**options)
+        transport = utils.get_transport_factory(
+            self.transport, self.accelerated).get_transport(socket)
+        factory = utils.get_protocol_factory(self.protocol, self.accelerated)
+        if self.multiplexed:
+            factory = thr.protocol.TMultiplexedProtocolFactory(factory, self.service_name)
+        protocol = factory.get_protocol(transport)
+        transport.open()
+        return Connection(socket, transport, protocol)
+
+    def acquire(self):
+        """Return a healthy connection from the pool or a new
+        connection.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if now - conn.last_used <= self.idle_timeout and conn.is_healthy():
+                    self.stats['reused'] += 1
+                    return conn
+                conn.close()
+                self.stats['discarded'] += 1
+            self.stats['created'] += 1
+        return self._connect()
+
+    def release(self, conn):
+        """Return the connection to the pool.
+        """
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+            self.stats['discarded'] += 1
+        conn.close()
+
+    def close(self):
+        """Close idle connections.
+        """
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+# Connection pools keyed by service endpoint and pool options
+_pools = {}
+_pools_lock = Lock()
+
+
+def get_connection_pool(service_name, **options):
+    """Return the connection pool of a thrift service endpoint, see
+    `ConnectionPool`.
+    """
+    key = (service_name,) + tuple(sorted(options.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(service_name, **options)
+    return pool
+
+
 class Client(object):
     """Thrift multiplex client.
 
     The thrift client loads the thrift configuration from a thrift
     server.
+
+    The connections to the server are kept open in a pool that is
+    shared by the clients of the same server, see `ConnectionPool`.
+    Use `pool_maxsize` and `pool_idle_timeout` options to configure
+    the pool, `pool_maxsize=0` disables pooling.
+
+    Use `protocol`, `transport`, and `accelerated` options to select
+    the protocol and transport stack of the server, see `Server`.
     """
 
     def __init__(self, thrift_content=None, **options):
@@ -76,6 +230,11 @@ class Client(object):
         self.multiplexed = options.pop('multiplexed', True)
         self.thrift_content_service = options.pop(
             'thrift_content_service', 'info')
+        self.pool_maxsize = options.pop('pool_maxsize', 8)
+        self.pool_idle_timeout = options.pop('pool_idle_timeout', 60)
+        self.protocol = options.pop('protocol', 'binary')
+        self.transport = options.pop('transport', 'buffered')
+        self.accelerated = options.pop('accelerated', True)
         self.options = options
         with lock:
             self._update_thrift()
@@ -88,33 +247,35 @@ class Client(object):
           service info { string thrift_content() }
 
         and the server thrift must run in multiplexed mode.
+
+        When the server implements `thrift_content_hash` method and
+        the content with the same hash is cached, the content is not
+        retrieved from the server, see `utils.load_thrift`.
         """
         if self.thrift_content is None:
-            i, fn = tempfile.mkstemp(suffix='.thrift', prefix='rpc-client0-')
-            f = os.fdopen(i, mode='w')
-            f.write('service %s { string thrift_content() }'
-                    % (self.thrift_content_service))
-            f.close()
-            tmp_thrift = thr.load(fn)
-            os.remove(fn)
-            if not self.multiplexed:
-                factory = thr.protocol.TBinaryProtocolFactory()
-            else:
-                factory = thr.protocol.TMultiplexedProtocolFactory(
-                    thr.protocol.TBinaryProtocolFactory(),
-                    self.thrift_content_service)
+            tmp_thrift = utils.load_thrift(
+                'service %s { string thrift_content(), string thrift_content_hash() }'
+                % (self.thrift_content_service))
             service = getattr(tmp_thrift, self.thrift_content_service)
-            ctx = thr.rpc.client_context(service,
-                                         proto_factory=factory,
-                                         **self.options)
-            with ctx as c:
-                self.thrift_content = c.thrift_content()
-        i, fn = tempfile.mkstemp(suffix='.thrift', prefix='rpc-client-')
-        f = os.fdopen(i, mode='w')
-        f.write(self.thrift_content)
-        f.close()
-        self.thrift = thr.load(fn)
-        os.remove(fn)
+            with self._client_context(self.thrift_content_service, service) as c:
+                try:
+                    content_hash = c.thrift_content_hash()
+                except thr.thrift.TApplicationException:
+                    # server does not implement thrift_content_hash
+                    content_hash = None
+                thrift_content = None
+                if content_hash is not None:
+                    thrift_content = utils.get_thrift_content(content_hash)
+                if thrift_content is None:
+                    thrift_content = c.thrift_content()
+            self.thrift_content = thrift_content
+        self.thrift = utils.load_thrift(self.thrift_content)
+
+    def supports(self, service_name, method_name):
+        """Check if server implements a service method.
+        """
+        service = getattr(self.thrift, service_name, None)
+        return method_name in getattr(service, 'thrift_services', ())
 
     def _args_to_thrift(self, spec, args):
         thrift_spec = spec.thrift_spec
@@ -139,6 +300,8 @@ class Client(object):
                 arg = types.fromobject(self.thrift, set, arg)
             elif t[0] == thr.thrift.TType.LIST:
                 arg = types.fromobject(self.thrift, list, arg)
+                if isinstance(t[2], tuple) and t[2][0] == thr.thrift.TType.STRUCT:
+                    arg = [types.fromobject(self.thrift, t[2][1], a) for a in arg]
             elif t[0] == thr.thrift.TType.MAP:
                 arg = types.fromobject(self.thrift, dict, arg)
             else:
@@ -149,6 +312,53 @@ class Client(object):
     def _result_from_thrift(self, spec, result):
         return from_thrift(self.thrift, spec, result)
 
+    def get_connection_pool(self, service_name):
+        """Return the connection pool of a service.
+        """
+        return get_connection_pool(
+            service_name, multiplexed=self.multiplexed, maxsize=self.pool_maxsize,
+            idle_timeout=self.pool_idle_timeout, protocol=self.protocol,
+            transport=self.transport, accelerated=self.accelerated, **self.options)
+
+    @contextlib.contextmanager
+    def _client_context(self, service_name, service=None):
+        if service is None:
+            service = getattr(self.thrift, service_name)
+        if not self.pool_maxsize:
+            factory = utils.get_protocol_factory(self.protocol, self.accelerated)
+            if self.multiplexed:
+                factory = thr.protocol.TMultiplexedProtocolFactory(
+                    factory, service_name)
+            with thr.rpc.client_context(
+                    service, proto_factory=factory,
+                    trans_factory=utils.get_transport_factory(self.transport, self.accelerated),
+                    **self.options) as c:
+                yield c
+            return
+        pool = self.get_connection_pool(service_name)
+        conn = pool.acquire()
+        try:
+            yield thr.thrift.TClient(service, conn.protocol)
+        except BaseException:
+            # the connection may be in the middle of a message
+            conn.close()
+            raise
+        pool.release(conn)
+
+    def _exc_info(self, msg):
+        """Return exc_info of the server exception `msg`.
+        """
+        if msg.kind == self.thrift.ExceptionKind.EXC_TBLIB:
+            return pickle.loads(msg.message)
+        elif msg.kind == self.thrift.ExceptionKind.EXC_MESSAGE:
+            et, ev = msg.message.split(':', 1)
+            et = __builtins__.get(et)
+            if et is None:
+                et = Exception
+                ev = msg.message
+            return et, et(ev.lstrip()), None
+        raise msg
+
     def __call__(self, **services):
         """Perform a RPC call to thrift server.
 
@@ -186,43 +396,109 @@ class Client(object):
 
         results = {}
         for service_name, query_dict in services.items():
-            factory = thr.protocol.TBinaryProtocolFactory()
-            if self.multiplexed:
-                factory = thr.protocol.TMultiplexedProtocolFactory(
-                    factory, service_name)
             service = getattr(self.thrift, service_name)
-            ctx = thr.rpc.client_context(service, proto_factory=factory,
-                                         **self.options)
             results[service_name] = {}
-            with ctx as c:
+            exc = None
+            with self._client_context(service_name) as c:
                 for query_name, query_args in query_dict.items():
                     argsmth = getattr(service, query_name + '_args')
                     query_args = self._args_to_thrift(argsmth, query_args)
                     mth = getattr(c, query_name)
                     assert mth is not None
-                    exc = None
                     try:
                         r = mth(*query_args)
                     except exception as msg:
                         if exception is Exception:
                             raise
-                        if msg.kind == self.thrift.ExceptionKind.EXC_TBLIB:
-                            exc = pickle.loads(msg.message)
-                        elif msg.kind == self.thrift.ExceptionKind.EXC_MESSAGE:
-                            et, ev = msg.message.split(':', 1)
-                            et = __builtins__.get(et)
-                            if et is None:
-                                et = Exception
-                                ev = msg.message
-                            exc = et, et(ev.lstrip()), None
-                        else:
-                            raise
+                        exc = self._exc_info(msg)
+                        break
                     except Exception as msg:
                         print(msg)
                         raise
-                    if exc is not None:
-                        six.reraise(*exc)   # RAISING SERVER EXCEPTION
                     r = self._result_from_thrift(
                         getattr(service, query_name + '_result'), r)
                     results[service_name][query_name] = r
+            # the connection is reusable after server exceptions
+            if exc is not None:
+                six.reraise(*exc)   # RAISING SERVER EXCEPTION
+        return results
+
+
+class AsyncClient(Client):
+    """Asyncio thrift multiplex client.
+
+    Up to `pool_size` requests per service are in flight
+    concurrently, each on its own connection. The connections are
+    kept open and reused by subsequent requests.
+    """
+
+    def __init__(self, thrift_content=None, pool_size=8, **options):
+        self.pool_size = pool_size
+        self._pools = {}
+        self._pools_loop = None
+        super().__init__(thrift_content=thrift_content, **options)
+
+    def _get_pool(self, service_name):
+        loop = asyncio.get_running_loop()
+        if self._pools_loop is not loop:
+            # connections cannot be shared between event loops
+            self._pools.clear()
+            self._pools_loop = loop
+        pool = self._pools.get(service_name)
+        if pool is None:
+            pool = self._pools[service_name] = asyncio.Semaphore(self.pool_size), []
+        return pool
+
+    async def _connect(self, service_name):
+        options = dict(self.options)
+        if 'socket_timeout' in options:
+            options['timeout'] = options.pop('socket_timeout')
+        factory = utils.get_protocol_factory(self.protocol, aio=True)
+        if self.multiplexed:
+            factory = thr.protocol.TMultiplexedProtocolFactory(factory, service_name)
+        service = getattr(self.thrift, service_name)
+        return await thr.contrib.aio.rpc.make_client(
+            service, proto_factory=factory,
+            trans_factory=utils.get_transport_factory(self.transport, aio=True), **options)
+
+    def close(self):
+        """Close idle connections. Must be called in the event loop of
+        the connections.
+        """
+        for semaphore, idle in self._pools.values():
+            while idle:
+                idle.pop().close()
+
+    async def __call__(self, **services):
+        """Perform a RPC call to thrift server, see `Client.__call__`.
+        """
+        exception = getattr(self.thrift, 'Exception', Exception)
+
+        results = {}
+        for service_name, query_dict in services.items():
+            service = getattr(self.thrift, service_name)
+            semaphore, idle = self._get_pool(service_name)
+            results[service_name] = {}
+            async with semaphore:
+                c = idle.pop() if idle else await self._connect(service_name)
+                exc = None
+                try:
+                    for query_name, query_args in query_dict.items():
+                        argsmth = getattr(service, query_name + '_args')
+                        query_args = self._args_to_thrift(argsmth, query_args)
+                        try:
+                            r = await getattr(c, query_name)(*query_args)
+                        except exception as msg:
+                            if exception is Exception:
+                                raise
+                            exc = self._exc_info(msg)
+                            break
+                        results[service_name][query_name] = self._result_from_thrift(
+                            getattr(service, query_name + '_result'), r)
+                except BaseException:
+                    c.close()
+                    raise
+                idle.append(c)
+                if exc is not None:
+                    six.reraise(*exc)   # RAISING SERVER EXCEPTION
         return results
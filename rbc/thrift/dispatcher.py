@@ -5,7 +5,7 @@ server.
 # Created: February 2019
 
 import os
-from .utils import resolve_includes
+from .utils import resolve_includes, get_thrift_content_hash
 from ..utils import runcommand
 
 
@@ -25,6 +25,9 @@ class Dispatcher(object):
         return resolve_includes(open(self.server.thrift_file).read(),
                                 [os.path.dirname(self.server.thrift_file)])
 
+    def thrift_content_hash(self):
+        return get_thrift_content_hash(self.thrift_content())
+
     def nvidia_smi_query(self):
         return runcommand('nvidia-smi', '-q')
 
@@ -4,6 +4,11 @@ service info {
      themselves to the servers rpc.thift version.
      */
     string thrift_content(),
+    /*
+     Returns the hash of thrift_content so that clients can reuse
+     the cached thrift configuration of the server.
+     */
+    string thrift_content_hash(),
     /*
      Returns the output of `nvidia-smi -q` command.
      */
@@ -10,7 +10,6 @@ configuration files that define available services and the methods.
 
 
 import os
-import tempfile
 import socket
 import time
 import multiprocessing
@@ -104,10 +103,18 @@ class MultiplexedProcessor(thr.thrift.TMultiplexedProcessor):
 
 class Server(object):
     """Multiplex thrift server
+
+    Use `protocol` ('binary' or 'compact'), `transport` ('buffered' or
+    'framed'), and `accelerated` options to select the protocol and
+    transport stack, see `utils.get_protocol_factory`. The clients must
+    use the same stack.
     """
 
     def __init__(self, dispatcher, thrift_file, **options):
         self.multiplexed = options.pop('multiplexed', True)
+        self.protocol = options.pop('protocol', 'binary')
+        self.transport = options.pop('transport', 'buffered')
+        self.accelerated = options.pop('accelerated', True)
         self.thrift_content_service = options.pop(
             'thrift_content_service', 'info')
         thrift_content = options.pop('thrift_content', None)
@@ -120,12 +127,7 @@ class Server(object):
         if thrift_content is None:
             thrift_content = utils.resolve_includes(
                 open(thrift_file).read(), [os.path.dirname(thrift_file)])
-        i, fn = tempfile.mkstemp(suffix='.thrift', prefix='rpc-server-')
-        f = os.fdopen(i, mode='w')
-        f.write(thrift_content)
-        f.close()
-        self.thrift = thr.load(fn, module_name=module_name)
-        os.remove(fn)
+        self.thrift = utils.load_thrift(thrift_content, module_name=module_name)
 
     @staticmethod
     def run(dispatcher, thrift_file, options):
@@ -187,6 +189,6 @@ class Server(object):
         server = thr.server.TThreadedServer(
             s_proc,
             TServerSocket(**self.options),
-            iprot_factory=thr.protocol.TBinaryProtocolFactory(),
-            itrans_factory=thr.transport.TBufferedTransportFactory())
+            iprot_factory=utils.get_protocol_factory(self.protocol, self.accelerated),
+            itrans_factory=utils.get_transport_factory(self.transport, self.accelerated))
         server.serve()
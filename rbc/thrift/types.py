@@ -155,6 +155,31 @@ def _postpickle_loads(data):
     return data
 
 
+class _ByteSpan(object):
+    # Exposes the memory of an array as a byte array via the array
+    # interface while keeping the array alive.
+    def __init__(self, base, ptr, size):
+        self.base = base
+        self.__array_interface__ = dict(shape=(size,), typestr='|u1',
+                                        data=(ptr, False), version=3)
+
+
+def _byte_span(arr):
+    """Return memoryview of the memory spanned by the items of array
+    `arr` and the byte offset of the first item in it. No data is
+    copied, also for non-contiguous arrays.
+    """
+    if arr.size == 0:
+        return memoryview(b''), 0
+    # flip the axes with negative strides to find the lowest address
+    flipped = arr[tuple(slice(None, None, -1) if s < 0 else slice(None)
+                        for s in arr.strides)]
+    size = sum((n - 1) * s for n, s in zip(flipped.shape, flipped.strides)) + arr.itemsize
+    ptr = flipped.__array_interface__['data'][0]
+    offset = arr.__array_interface__['data'][0] - ptr
+    return memoryview(np.asarray(_ByteSpan(flipped, ptr, size))), offset
+
+
 class Data(object):
     """Represents any data that interpretation is defined by info and kind
     attributes.
@@ -201,8 +226,10 @@ class Buffer(object):
         if isinstance(data, str):
             data = data.encode()
         elif isinstance(data, np.ndarray):
-            data = data.tobytes()
-        if not isinstance(data, bytes):
+            data = _byte_span(np.ascontiguousarray(data))[0]
+        elif isinstance(data, (bytearray, memoryview)):
+            data = memoryview(data).cast('B')
+        if not isinstance(data, (bytes, memoryview)):
             raise NotImplementedError('Buffer from {}'.format(type(data)))
         r.data = data
         return r
@@ -215,7 +242,7 @@ class Buffer(object):
                 return data
             data = data.encode()
         if cls is bytes:
-            return data
+            return bytes(data)
         if cls is np.ndarray or cls is None:
             return np.frombuffer(data, dtype=np.uint8)
         raise NotImplementedError('Buffer to {}'.format(cls))
@@ -224,6 +251,11 @@ class Buffer(object):
 class NDArray(object):
     """Represents N-dimensional array that is mapped to/from numpy
     ndarray.
+
+    The array data is not copied when creating NDArray instances.
+    Non-contiguous arrays are sent together with their strides unless
+    the memory spanned by the array is more than twice the size of the
+    array data, in which case a C-contiguous copy is sent.
     """
 
     def __new__(cls, thrift, data):
@@ -232,10 +264,19 @@ class NDArray(object):
             r.data = data.data
             r.typestr = data.typestr
             r.shape = data.shape
+            r.strides = data.strides
+            r.offset = data.offset
         elif isinstance(data, np.ndarray):
             r.shape = list(data.shape)
             r.typestr = data.dtype.str
-            r.data = data.tobytes()   # ensures C-contiguous array
+            span, offset = _byte_span(data)
+            if span.nbytes > 2 * data.nbytes:
+                data = np.ascontiguousarray(data)
+                span, offset = _byte_span(data)
+            r.data = span
+            if not data.flags.c_contiguous:
+                r.strides = list(data.strides)
+                r.offset = offset
         else:
             raise NotImplementedError('Buffer from {}'.format(type(data)))
         return r
@@ -248,6 +289,10 @@ class NDArray(object):
         if cls is np.ndarray or cls is None:
             if isinstance(data, str):
                 data = data.encode()
-            # C-contiguous array
-            return np.frombuffer(data, dtype=dtype).reshape(shape)
+            strides = getattr(obj, 'strides', None)
+            if strides is None:
+                # C-contiguous array
+                return np.frombuffer(data, dtype=dtype).reshape(shape)
+            return np.ndarray(shape, dtype=dtype, buffer=data, offset=obj.offset or 0,
+                              strides=tuple(strides))
         raise NotImplementedError('NDArray to {}'.format(cls))
@@ -30,4 +30,6 @@ struct NDArray {
     1: list<i32> shape;
     2: string typestr;
     3: binary data;
+    4: optional list<i64> strides;  // unset for C-contiguous data
+    5: optional i64 offset;  // byte offset of the first item in data
 }
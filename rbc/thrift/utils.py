@@ -1,8 +1,24 @@
 import inspect
+import io
 import os
 import re
+import sys
 import functools
+import threading
+import warnings
 from . import types
+from .. import cache as _cache
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import thriftpy2 as thr
+    import thriftpy2.parser
+    import thriftpy2.protocol
+    import thriftpy2.protocol.binary
+    import thriftpy2.transport
+    import thriftpy2.transport.buffered
+    import thriftpy2.transport.framed
+    import thriftpy2.contrib.aio.protocol
+    import thriftpy2.contrib.aio.transport
 
 include_match = re.compile(r'^\s*include\s+"(?P<filename>[\w._/\\]+)"',
                            flags=re.M).match
@@ -90,3 +106,152 @@ def dispatchermethod(mth):
         return types.fromobject(thrift, tcls, r)
     wrapper.signature = signature
     return wrapper
+
+
+# Loaded thrift modules keyed by content hash and module name, and
+# thrift contents keyed by content hash
+_thrift_modules = {}
+_thrift_contents = {}
+_thrift_lock = threading.Lock()
+_thrift_caches = {}
+
+
+def get_thrift_cache():
+    """Return the persistent cache of thrift contents.
+
+    The cache is enabled when the environment variable RBC_CACHE_DIR
+    is set, otherwise None is returned.
+    """
+    path = os.environ.get('RBC_CACHE_DIR')
+    if not path:
+        return
+    cache = _thrift_caches.get(path)
+    if cache is None:
+        max_size = int(os.environ.get('RBC_CACHE_MAX_SIZE', 2**28))
+        cache = _thrift_caches[path] = _cache.DiskCache(path, max_size=max_size)
+    return cache
+
+
+def get_thrift_content_hash(thrift_content):
+    """Return the hash of thrift content.
+    """
+    return _cache.hashkey('thrift', thrift_content)
+
+
+def get_thrift_content(content_hash):
+    """Return thrift content with given hash from the in-process or
+    persistent cache, or None when not found.
+    """
+    thrift_content = _thrift_contents.get(content_hash)
+    if thrift_content is None:
+        cache = get_thrift_cache()
+        if cache is not None:
+            thrift_content = cache.get(content_hash)
+    return thrift_content
+
+
+def load_thrift(thrift_content, module_name=None):
+    """Return thrift module of the thrift content.
+
+    Loaded modules are cached by the hash of the content and the
+    module name. The content is stored also in the persistent cache,
+    see `get_thrift_cache`.
+    """
+    content_hash = get_thrift_content_hash(thrift_content)
+    if module_name is None:
+        module_name = f'rbc_{content_hash[:16]}_thrift'
+    key = content_hash, module_name
+    with _thrift_lock:
+        thrift = _thrift_modules.get(key)
+        if thrift is not None:
+            return thrift
+        thrift = thr.parser.parse_fp(io.StringIO(thrift_content), module_name,
+                                     enable_cache=False)
+        sys.modules[module_name] = thrift
+        _thrift_modules[key] = thrift
+        if content_hash not in _thrift_contents:
+            _thrift_contents[content_hash] = thrift_content
+            cache = get_thrift_cache()
+            if cache is not None and content_hash not in cache:
+                cache.set(content_hash, thrift_content)
+    return thrift
+
+
+class TCompactProtocol(thr.protocol.TCompactProtocol):
+    """Compact protocol that supports writing binary data from buffers,
+    see `types.NDArray`.
+    """
+
+    def _write_binary(self, b):
+        if isinstance(b, memoryview) and not isinstance(self.trans, thr.transport.TTransportBase):
+            # Cython transports accept only bytes
+            b = b.tobytes()
+        super()._write_binary(b)
+
+
+class TCompactProtocolFactory(thr.protocol.TCompactProtocolFactory):
+
+    def get_protocol(self, trans):
+        return TCompactProtocol(trans, decode_response=self.decode_response,
+                                strict_decode=self.strict_decode)
+
+
+# Protocol and transport factories: name -> (pure Python, accelerated, asyncio)
+protocol_factories = dict(
+    binary=(thr.protocol.binary.TBinaryProtocolFactory,
+            getattr(thr.protocol, 'TCyBinaryProtocolFactory', None),
+            thr.contrib.aio.protocol.TAsyncBinaryProtocolFactory),
+    compact=(TCompactProtocolFactory,
+             None,
+             thr.contrib.aio.protocol.TAsyncCompactProtocolFactory),
+)
+transport_factories = dict(
+    buffered=(thr.transport.buffered.TBufferedTransportFactory,
+              getattr(thr.transport, 'TCyBufferedTransportFactory', None),
+              thr.contrib.aio.transport.TAsyncBufferedTransportFactory),
+    framed=(thr.transport.framed.TFramedTransportFactory,
+            getattr(thr.transport, 'TCyFramedTransportFactory', None),
+            thr.contrib.aio.transport.TAsyncFramedTransportFactory),
+)
+
+
+def _get_factory(factories, kind, name, accelerated, aio):
+    if name not in factories:
+        raise ValueError(f'unknown thrift {kind} {name!r}, expected one of'
+                         f' {", ".join(factories)}')
+    pure, cython, asyncio = factories[name]
+    if aio:
+        return asyncio()
+    if accelerated and cython is not None:
+        return cython()
+    return pure()
+
+
+def get_protocol_factory(protocol='binary', accelerated=True, aio=False):
+    """Return thrift protocol factory.
+
+    Parameters
+    ----------
+    protocol : {'binary', 'compact'}
+      Specify the protocol name.
+    accelerated : bool
+      When True, use Cython-accelerated factory when available.
+    aio : bool
+      When True, return asyncio factory.
+    """
+    return _get_factory(protocol_factories, 'protocol', protocol, accelerated, aio)
+
+
+def get_transport_factory(transport='buffered', accelerated=True, aio=False):
+    """Return thrift transport factory.
+
+    Parameters
+    ----------
+    transport : {'buffered', 'framed'}
+      Specify the transport name.
+    accelerated : bool
+      When True, use Cython-accelerated factory when available.
+    aio : bool
+      When True, return asyncio factory.
+    """
+    return _get_factory(transport_factories, 'transport', transport, accelerated, aio)
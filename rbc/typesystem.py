@@ -6,9 +6,13 @@
 
 import re
 import copy
+import bisect
+import functools
 import ctypes
 import _ctypes
 import inspect
+import types
+import threading
 from llvmlite import ir
 import warnings
 
@@ -155,6 +159,277 @@ _type_name_match = re.compile(r'\A(.*)\s(\w+)\Z').match
 # `signed`, `unsigned`, `long`, etc.:
 _bad_names_match = re.compile(r'\A(char|byte|short|int|long|double)\Z').match
 
+_bracket_finditer = re.compile(r'[(){}\[\]<>,]').finditer
+# The bracket levels of (), {}, [], and <> are combined into a single
+# integer using a base that is larger than any level difference
+_bracket_deltas = {'(': 1, ')': -1, '{': 1 << 32, '}': -(1 << 32),
+                   '[': 1 << 64, ']': -(1 << 64), '<': 1 << 96, '>': -(1 << 96)}
+
+
+class _TypeParser:
+    """Parser of type strings.
+
+    The string is scanned once for brackets and commas. The parser
+    works on the spans of the string and uses the scan results for
+    finding matching parenthesis and top-level commas, see `_findparen`
+    and `_commasplit` for the corresponding string based algorithms.
+
+    Used internally.
+    """
+
+    def __init__(self, cls, s):
+        self.cls = cls
+        self.s = s
+        deltas = _bracket_deltas
+        self.lparens = {}     # maps the index of ')' to the index of matching '('
+        self.ppos = []        # the indices of parenthesis
+        self.pdepths = []     # the parenthesis depths after the parenthesis
+        self.bpos = []        # the indices of brackets
+        self.blevels = []     # the levels after the brackets
+        self.commas = []      # the indices of commas
+        self.clevels = []     # the levels at commas
+        stack = []
+        level = 0
+        for m in _bracket_finditer(s):
+            c = m.group()
+            i = m.start()
+            if c == ',':
+                self.commas.append(i)
+                self.clevels.append(level)
+                continue
+            if c == '(':
+                stack.append(i)
+            elif c == ')':
+                if stack:
+                    self.lparens[i] = stack.pop()
+            level += deltas[c]
+            self.bpos.append(i)
+            self.blevels.append(level)
+            if c in '()':
+                self.ppos.append(i)
+                self.pdepths.append((self.pdepths[-1] if self.pdepths else 0) + deltas[c])
+        # sparse table of range minimums of pdepths, see `findparen`
+        self.pmins = [self.pdepths]
+        k = 1
+        while 2 * k <= len(self.pdepths):
+            prev = self.pmins[-1]
+            self.pmins.append([min(prev[n], prev[n + k]) for n in range(len(prev) - k)])
+            k *= 2
+
+    def level(self, i):
+        """Return the bracket level of s[:i].
+        """
+        k = bisect.bisect_left(self.bpos, i)
+        return self.blevels[k - 1] if k else 0
+
+    def strip(self, i, j):
+        s = self.s
+        while i < j and s[i].isspace():
+            i += 1
+        while j > i and s[j - 1].isspace():
+            j -= 1
+        return i, j
+
+    def findparen(self, i, j):
+        """Return the index of '(' that matches with ')' at s[j - 1].
+        """
+        a, b = bisect.bisect_left(self.ppos, i), bisect.bisect_left(self.ppos, j)
+        depth = self.pdepths[a - 1] if a else 0
+        if a < b:
+            # minimum depth within s[i:j] in constant time
+            r = (b - a).bit_length() - 1
+            mins = self.pmins[r]
+            balanced = (self.pdepths[b - 1] == depth
+                        and min(mins[a], mins[b - (1 << r)]) >= depth)
+        else:
+            balanced = False
+        if not balanced:
+            # parenthesis are not balanced, use the string based algorithm
+            # to produce the same errors
+            return i + _findparen(self.s[i:j])
+        return self.lparens[j - 1]
+
+    def commasplit(self, i, j):
+        """Return the spans of comma-separated items of s[i:j].
+        """
+        i, j = self.strip(i, j)
+        level = self.level(i)
+        if self.level(j) != level:
+            raise TypeParseError('failed to comma-split `%s`' % self.s[i:j])
+        spans = []
+        start = i
+        for k in range(bisect.bisect_left(self.commas, i), bisect.bisect_left(self.commas, j)):
+            if self.clevels[k] == level:
+                spans.append((start, self.commas[k]))
+                start = self.commas[k] + 1
+        spans.append((start, j))
+        return spans
+
+    def parse_items(self, i, j):
+        return tuple(self.parse(a, b) for a, b in self.commasplit(i, j))
+
+    def parse(self, i, j):
+        """Return Type instance from s[i:j].
+        """
+        cls = self.cls
+        s = self.s
+        i, j = self.strip(i, j)
+        last = s[j - 1] if i < j else ''
+        if j - i > 1 and last == '*':       # pointer
+            return cls(self.parse(i, j - 1), '*')
+        if last == '}':       # struct
+            if s[i] != '{':
+                raise TypeParseError(
+                    'mismatching curly parenthesis in `%s`' % (s[i:j]))
+            return cls(*self.parse_items(i + 1, j - 1))
+        if last == ')':       # function
+            k = self.findparen(i, j)
+            atypes = self.parse_items(k + 1, j - 1)
+            ri, rj = self.strip(i, k)
+            if ri < rj and s[rj - 1] == ')':
+                rk = self.findparen(ri, rj)
+                rtype = self.parse(ri, rk)
+                di, dj = self.strip(rk + 1, rj - 1)
+                if di < dj and s[di] == '*':
+                    while di < dj and s[di] == '*':
+                        di, dj = self.strip(di + 1, dj)
+                    if di < dj and s[dj - 1] == ')':
+                        dk = self.findparen(di, dj)
+                        name = s[di:dk]
+                        rtype = cls(rtype, atypes, name='')
+                        atypes = self.parse_items(dk + 1, dj - 1)
+                        return cls(rtype, atypes, name=name)
+                    name = s[di:dj]
+                    return cls(rtype, atypes, name=name)
+            rtype = self.parse(ri, rj)
+            if rtype.is_function:
+                name = rtype._params['name']
+                rtype._params['name'] = ''
+            else:
+                name = rtype._params.pop('name', '')
+            return cls(rtype, atypes, name=name)
+
+        i_bar, i_gt = s.find('|', i, j), s.find('>', i, j)
+        if i_bar != -1 and (i_gt == -1 or i_bar > i_gt):
+            k = s.rfind('|', i, j)
+            t = self.parse(i, k)
+            a = s[k + 1:j]
+            if '=' in a:
+                n, v = a.split('=', 1)
+            else:
+                n, v = a, ''
+            n = n.strip()
+            v = v.strip()
+            if n or v:
+                t.annotation(**{n: v})
+            return t
+        if last == '>' and s[i] != '<':  # custom
+            k = s.find('<', i, j)
+            if k == -1:
+                raise ValueError('substring not found')
+            name = s[i:k]
+            params = self.parse_items(k + 1, j - 1)
+            name = cls.aliases.get(name, name)
+            if name in cls.custom_types:
+                return cls.custom_types[name](params)
+            return cls((name,) + params)
+        text = s[i:j]
+        if text == 'void' or text == 'none' or not text:  # void
+            return cls()
+        m = _type_name_match(text)
+        if m is not None:
+            name = m.group(2)
+            if not _bad_names_match(name):
+                # `<typespec> <name>`
+                t = self.parse(i + m.start(1), i + m.end(1))
+                t._params['name'] = name
+                return t
+        # atomic
+        if text in cls.custom_types:
+            return cls.custom_types[text](())
+        return cls(text)
+
+
+def _fromstring(cls, s):
+    try:
+        return cls._fromstring(s)._normalize()
+    except TypeParseError as msg:
+        raise ValueError('failed to parse `%s`: %s' % (s, msg))
+
+
+@functools.lru_cache(maxsize=4096)
+def _fromstring_cached(key):
+    """Return cached result of Type.fromstring. The key contains the Type
+    class, the string, and the state that the result depends on:
+    aliases, target info, and custom types.
+
+    The result must not be modified, see `_copy_type`.
+    """
+    t = _fromstring(key[0], key[1])
+    try:
+        t.intern()
+    except TypeError:  # unhashable parameters of custom types
+        pass
+    return t
+
+
+# Maps (class, type) pairs to the canonical instances, see
+# Type.intern. The table is cleared when it reaches the maximal size,
+# the canonical instances remember the generation of the table.
+_interned_types = {}
+_interned_types_lock = threading.Lock()
+_interned_types_generation = 0
+_max_interned_types = 1 << 16
+
+# Maps pairs of atomic type names to the penalties of Type.match. The
+# penalties depend only on the names of the types, hence the table is
+# shared between targets. See `_init_scalar_match_penalties`.
+_scalar_match_penalties = {}
+_unknown_penalty = object()
+
+
+def _intern_type(key, t):
+    """Return the canonical instance of the key, t is added to the
+    intern table when the key is not found.
+    """
+    global _interned_types_generation
+    with _interned_types_lock:
+        r = _interned_types.get(key)
+        if r is None:
+            if len(_interned_types) >= _max_interned_types:
+                _interned_types.clear()
+                _interned_types_generation += 1
+            t._generation = _interned_types_generation
+            r = _interned_types[key] = t
+        return r
+
+
+def _intern_item(a):
+    if isinstance(a, Type):
+        return a.intern()
+    if isinstance(a, tuple):
+        return tuple(map(_intern_item, a))
+    return a
+
+
+def _copy_type(t):
+    """Return a copy of Type instance with its parameters and the copies
+    of its items.
+
+    Used internally.
+    """
+    if isinstance(t, Type):
+        r = tuple.__new__(type(t), tuple(map(_copy_type, t)))
+        r.__dict__.update(t.__dict__)
+        r.__dict__.pop('_interned', None)
+        r._params = {k: copy.deepcopy(v) if isinstance(v, (dict, list)) else v
+                     for k, v in t._params.items()}
+        return r
+    if isinstance(t, tuple):
+        return tuple(map(_copy_type, t))
+    return t
+
+
 # For the custom type support:
 _custom_type_name_params_match = re.compile(r'\A(\w+)\s*[<](.*)[>]\Z').match
 
@@ -284,6 +559,9 @@ assert not _i, repr(_i)
 class MetaType(type):
 
     custom_types = dict()
+    # Incremented when a custom type is defined, used in the key of
+    # fromstring cache
+    custom_types_version = 0
     aliases = dict()
 
     # ctypes generated types need to be cached to be usable
@@ -293,6 +571,7 @@ class MetaType(type):
         cls = super().__new__(cls, name, bases, dct)
         if name != 'Type':
             cls.custom_types[name] = cls
+            MetaType.custom_types_version += 1
         return cls
 
     def alias(cls, **aliases):
@@ -401,6 +680,9 @@ class Type(tuple, metaclass=MetaType):
 
     _mangling = None
 
+    # True for the canonical instances returned by `intern`
+    _interned = False
+
     def __new__(cls, *args, **params):
         args = cls.preprocess_args(args)
         obj = tuple.__new__(cls, args)
@@ -412,6 +694,84 @@ class Type(tuple, metaclass=MetaType):
                 'attempt to create an invalid Type object from `%s`' % (args,))
         return obj.postprocess_type()
 
+    def __hash__(self):
+        # The items of Type instance are immutable, hence the hash
+        # value can be cached
+        h = self.__dict__.get('_hash')
+        if h is None:
+            h = self._hash = tuple.__hash__(self)
+        return h
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Type):
+            c1 = self.__dict__.get('_canonical')
+            c2 = other.__dict__.get('_canonical')
+            if c1 is not None and c2 is not None:
+                if c1 is c2:
+                    return True
+                if type(c1) is type(c2) and c1._generation == c2._generation:
+                    return False
+            try:
+                if hash(self) != hash(other):
+                    return False
+            except TypeError:  # unhashable parameters of custom types
+                pass
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        r = self.__eq__(other)
+        return r if r is NotImplemented else not r
+
+    def __getnewargs_ex__(self):
+        return tuple(self), dict(self._params)
+
+    def __getstate__(self):
+        # The cached hash value is process specific and a copy is not
+        # the canonical instance, see `intern`
+        state = dict(self.__dict__)
+        for name in ['_hash', '_canonical', '_interned', '_generation']:
+            state.pop(name, None)
+        return state
+
+    def intern(self):
+        """Return the canonical instance of type.
+
+        Interned types have no parameters except the empty name of
+        function types, and the equal interned types of the same
+        generation of the intern table are the same object, so that
+        comparing and hashing interned types is cheap.
+        Interned types are shared and must not be modified in-place:
+        `params` returns a modified copy and `annotation` returns a
+        read-only mapping. Use `t | annotations` for annotating.
+
+        The canonical instance is remembered in the type and its items
+        so that comparing types that have been interned is cheap as
+        well.
+        """
+        t = self.__dict__.get('_canonical')
+        if t is None:
+            key = type(self), self
+            t = _interned_types.get(key)
+            if t is None:
+                items = tuple(_intern_item(a) for a in self)
+                t = tuple.__new__(type(self), items)
+                t._params = {'name': ''} if self.is_function else {}
+                t._interned = True
+                t._canonical = t
+                t = _intern_type(key, t)
+            else:
+                # remember canonical instances of the items as well
+                for a in self:
+                    _intern_item(a)
+            self._canonical = t
+        return t
+
+    @property
+    def is_interned(self):
+        return self._interned
+
     def copy(self, cls=None):
         """Return a copy of type.
         """
@@ -436,6 +796,11 @@ class Type(tuple, metaclass=MetaType):
     def annotation(self, **annotations):
         """Set and get annotations.
         """
+        if self._interned:
+            if annotations:
+                raise TypeError('cannot annotate interned type in-place,'
+                                ' use `type | annotations` instead')
+            return types.MappingProxyType({})
         annotation = self._params.get('annotation')
         if annotation is None:
             annotation = self._params['annotation'] = {}
@@ -445,9 +810,10 @@ class Type(tuple, metaclass=MetaType):
     def __or__(self, other):
         """Apply annotations to a copy of type instance.
         """
-        self.annotation()  # ensures annotation key in _params
+        if not self._interned:
+            self.annotation()  # ensures annotation key in _params
         params = self._params.copy()
-        annotation = params['annotation'] = params['annotation'].copy()
+        annotation = params['annotation'] = dict(params.get('annotation', {}))
         if isinstance(other, str):
             if other:
                 annotation[other] = ''
@@ -477,7 +843,11 @@ class Type(tuple, metaclass=MetaType):
 
     def params(self, other=None, **params):
         """In-place update of parameters from other or/and dictionary and return self.
+
+        For interned types, the parameters of a copy are updated.
         """
+        if self._interned:
+            return self.copy().params(other, **params)
         if other is not None:
             return self.params(None, **other._params).params(None, **params)
         for k, v in params.items():
@@ -981,100 +1351,26 @@ class Type(tuple, metaclass=MetaType):
 
     @classmethod
     def _fromstring(cls, s):
-        s = s.strip()
-        if len(s) > 1 and s.endswith('*'):       # pointer
-            return cls(cls._fromstring(s[:-1]), '*')
-        if s.endswith('}'):       # struct
-            if not s.startswith('{'):
-                raise TypeParseError(
-                    'mismatching curly parenthesis in `%s`' % (s))
-            return cls(*map(cls._fromstring,
-                            _commasplit(s[1:-1].strip())))
-        if s.endswith(')'):       # function
-            i = _findparen(s)
-            if i < 0:
-                raise TypeParseError('mismatching parenthesis in `%s`' % (s))
-            atypes = tuple(map(cls._fromstring,
-                               _commasplit(s[i+1:-1].strip())))
-            r = s[:i].strip()
-            if r.endswith(')'):
-                j = _findparen(r)
-                if j < 0:
-                    raise TypeParseError('mismatching parenthesis in `%s`' % (r))
-                rtype = cls._fromstring(r[:j])
-                d = r[j+1:-1].strip()
-                if d.startswith('*'):
-                    while d.startswith('*'):
-                        d = d[1:].lstrip()
-                    if d.endswith(')'):
-                        k = _findparen(d)
-                        name = d[:k]
-                        rtype = cls(rtype, atypes, name='')
-                        atypes = tuple(map(cls._fromstring,
-                                           _commasplit(d[k+1:-1].strip())))
-                        return cls(rtype, atypes, name=name)
-                    name = d
-                    return cls(rtype, atypes, name=name)
-            rtype = cls._fromstring(r)
-            if rtype.is_function:
-                name = rtype._params['name']
-                rtype._params['name'] = ''
-            else:
-                name = rtype._params.pop('name', '')
-            return cls(rtype, atypes, name=name)
-
-        i_bar, i_gt = s.find('|'), s.find('>')  # TODO: will need a better parser
-        if '|' in s and (i_gt == -1 or i_bar > i_gt):
-            s, a = s.rsplit('|', 1)
-            t = cls._fromstring(s.rstrip())
-            if '=' in a:
-                n, v = a.split('=', 1)
-            else:
-                n, v = a, ''
-            n = n.strip()
-            v = v.strip()
-            if n or v:
-                t.annotation(**{n: v})
-            return t
-        if s.endswith('>') and not s.startswith('<'):  # custom
-            i = s.index('<')
-            name = s[:i]
-            params = _commasplit(s[i+1:-1].strip())
-            params = tuple(map(cls._fromstring, params)) if params else ()
-            name = cls.aliases.get(name, name)
-            if name in cls.custom_types:
-                cls = cls.custom_types[name]
-                r = cls(params)
-            else:
-                r = cls((name,) + params)
-            return r
-        if s == 'void' or s == 'none' or not s:  # void
-            return cls()
-        m = _type_name_match(s)
-        if m is not None:
-            name = m.group(2)
-            if not _bad_names_match(name):
-                # `<typespec> <name>`
-                t = cls._fromstring(m.group(1))
-                t._params['name'] = name
-                return t
-        # atomic
-        if s in cls.custom_types:
-            return cls.custom_types[s](())
-        return cls(s)
+        return _TypeParser(cls, s).parse(0, len(s))
 
     @classmethod
     def fromstring(cls, s):
         """Return new Type instance from a string.
 
+        The results are cached per string, type aliases, and the
+        current target info.
+
         Parameters
         ----------
         s : str
         """
+        key = (cls, s, tuple(cls.aliases.items()), TargetInfo._instance,
+               cls.custom_types_version)
         try:
-            return cls._fromstring(s)._normalize()
-        except TypeParseError as msg:
-            raise ValueError('failed to parse `%s`: %s' % (s, msg))
+            hash(key)
+        except TypeError:  # unhashable aliases
+            return _fromstring(cls, s)
+        return _copy_type(_fromstring_cached(key))
 
     @classmethod
     def fromnumpy(cls, t):
@@ -1406,6 +1702,18 @@ class Type(tuple, metaclass=MetaType):
           Penalty of a match. For a perfect match, penalty is 0.
           If match is impossible, return None
         """
+        if (isinstance(other, Type) and len(self) == 1 and len(other) == 1
+                and type(self[0]) is str and type(other[0]) is str):
+            # atomic types, see _scalar_match_penalties
+            key = self[0], other[0]
+            penalty = _scalar_match_penalties.get(key, _unknown_penalty)
+            if penalty is _unknown_penalty:
+                penalty = self._match(other)
+                _scalar_match_penalties[key] = penalty
+            return penalty
+        return self._match(other)
+
+    def _match(self, other):
         if isinstance(other, Type):
             if self == other:
                 return 0
@@ -1790,6 +2098,24 @@ for _i, _p1 in enumerate(_pointer_types[:2]):
             _p2, _p1, typeconv.Conversion.safe)
 
 
+def _init_scalar_match_penalties():
+    """Precompute the match penalties between the standard scalar types.
+    """
+    names = (['bool', 'bool1', 'bool8']
+             + [f'{k}{b}' for k in ('int', 'uint') for b in (8, 16, 32, 64)]
+             + ['float16', 'float32', 'float64', 'complex64', 'complex128',
+                'char8', 'char16', 'char32', 'string', 'void'])
+    for a in names:
+        for b in names:
+            try:
+                Type(a).match(Type(b))
+            except NotImplementedError:
+                pass
+
+
+_init_scalar_match_penalties()
+
+
 _ufunc_pos_args_match = re.compile(
     r'(?P<name>\w[\w\d_]*)\s*[(](?P<pos_args>[^/)]*)[/]?(?P<rest>.*)[)]').match
 _req_opt_args_match = re.compile(r'(?P<req_args>[^[]*)(?P<opt_args>.*)').match